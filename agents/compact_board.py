@@ -0,0 +1,776 @@
+# agents/compact_board.py
+import chess
+import chess.polyglot
+
+from agents.pawn_structure import pawn_key
+from agents.transposition_table import board_key
+
+# Thế cờ gọn nhẹ cho vòng lặp search (chỉ cờ vua chuẩn, không hỗ trợ chess960):
+# - bitboard theo loại quân + mảng 64 ô (mailbox) để tra quân ở một ô trong O(1)
+# - nước đi là số nguyên from | to << 6 | promotion << 12 (cùng mã với encode_move của TT)
+# - make/unmake (push/pop) chỉ lưu một tuple trạng thái, không tạo object Move / snapshot
+# - Zobrist key (polyglot), điểm MG/EG/phase và pawn key được cập nhật ngay trong push
+# - lịch sử Zobrist key (history) đi cùng push/pop để phát hiện lặp lại thế cờ / xin hoà mà
+#   không phải đi lại ván cờ như chess.Board.can_claim_draw
+# Chuyển đổi một lần ở root: CompactBoard.from_board(chess.Board).
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+WHITE, BLACK = True, False
+
+BB_SQUARES = chess.BB_SQUARES
+BB_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+BB_KING_ATTACKS = chess.BB_KING_ATTACKS
+BB_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+BB_DIAG_MASKS = chess.BB_DIAG_MASKS
+BB_DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+BB_FILE_MASKS = chess.BB_FILE_MASKS
+BB_FILE_ATTACKS = chess.BB_FILE_ATTACKS
+BB_RANK_MASKS = chess.BB_RANK_MASKS
+BB_RANK_ATTACKS = chess.BB_RANK_ATTACKS
+BB_RANK_1 = chess.BB_RANK_1
+BB_RANK_8 = chess.BB_RANK_8
+BB_BACKRANKS = (BB_RANK_8, BB_RANK_1)       # theo màu: [Đen, Trắng]
+BB_PAWN_DOUBLE = (chess.BB_RANK_6, chess.BB_RANK_3)
+BB_ALL = chess.BB_ALL
+BB_RAYS = chess.BB_RAYS
+BB_BETWEEN = [[chess.between(a, b) for b in range(64)] for a in range(64)]
+
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+# PIECE_KEYS[color][ptype][sq], cùng cách đánh chỉ số với chess.polyglot
+PIECE_KEYS = [
+    [[0] * 64] + [[_RANDOM[64 * ((ptype - 1) * 2 + color) + sq] for sq in range(64)] for ptype in range(1, 7)]
+    for color in (0, 1)
+]
+TURN_KEY = _RANDOM[780]
+EP_KEYS = [_RANDOM[772 + f] for f in range(8)]
+# CASTLING_KEYS[i]: key của quyền nhập thành, i = bit (H1, A1, H8, A8)
+CASTLING_KEYS = [0] * 16
+for _i in range(16):
+    for _bit in range(4):
+        if _i >> _bit & 1:
+            CASTLING_KEYS[_i] ^= _RANDOM[768 + _bit]
+
+
+def _castling_index(rights):
+    return ((rights >> 7) & 1) | ((rights & 1) << 1) | ((rights >> 63) << 2) | (((rights >> 56) & 1) << 3)
+
+
+class CompactBoard:
+    __slots__ = (
+        'by_type', 'occupied_co', 'pieces', 'turn', 'castling_rights', 'ep_square',
+        'halfmove_clock', 'key', 'mg', 'eg', 'phase', 'pawn_key',
+        'mg_psq', 'eg_psq', 'phase_weight', '_stack', 'history',
+    )
+
+    def __init__(self):
+        # by_type[ptype]: bitboard của loại quân (cả hai màu), by_type[0] không dùng
+        self.by_type = [0] * 7
+        self.occupied_co = [0, 0]
+        self.pieces = [0] * 64
+        self.turn = WHITE
+        self.castling_rights = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.key = 0
+        self.mg = 0
+        self.eg = 0
+        self.phase = 0
+        self.pawn_key = 0
+        self.mg_psq = None
+        self.eg_psq = None
+        self.phase_weight = None
+        self._stack = []
+        # history[-d]: Zobrist key của thế cờ d ply trước (None = nước null). Gồm cả các thế cờ
+        # của ván trước khi chuyển sang CompactBoard, trong cửa sổ halfmove_clock
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board, evaluator=None):
+        # evaluator: BitboardEvaluator để cập nhật điểm MG/EG/phase tăng dần trong push/pop
+        if board.chess960:
+            raise ValueError("CompactBoard không hỗ trợ chess960")
+
+        cb = cls()
+        cb.by_type = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        cb.occupied_co = [board.occupied_co[BLACK], board.occupied_co[WHITE]]
+        for sq in chess.scan_forward(board.occupied):
+            cb.pieces[sq] = board.piece_type_at(sq)
+        cb.turn = board.turn
+        cb.castling_rights = board.clean_castling_rights()
+        cb.ep_square = board.ep_square
+        cb.halfmove_clock = board.halfmove_clock
+        cb.key = board_key(board)
+        cb.pawn_key = pawn_key(cb)
+        # Thế cờ xa hơn halfmove_clock không thể lặp lại (đã có nước ăn quân / đi Tốt)
+        window = min(board.halfmove_clock, len(board.move_stack))
+        if window:
+            replay = board.copy(stack=window)
+            for _ in range(window):
+                replay.pop()
+                cb.history.append(board_key(replay))
+            cb.history.reverse()
+        if evaluator is not None:
+            cb.mg_psq = evaluator.mg_psq
+            cb.eg_psq = evaluator.eg_psq
+            cb.phase_weight = evaluator.phase_weight
+            cb.mg, cb.eg, cb.phase = evaluator.compute(cb)
+        return cb
+
+    def to_board(self):
+        board = chess.Board(None)
+        for sq in chess.scan_forward(self.occupied):
+            board.set_piece_at(sq, self.piece_at(sq))
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        return board
+
+    # --- Cùng tên thuộc tính với chess.Board để hàm đánh giá / pawn hash dùng chung ---
+
+    @property
+    def pawns(self):
+        return self.by_type[PAWN]
+
+    @property
+    def knights(self):
+        return self.by_type[KNIGHT]
+
+    @property
+    def bishops(self):
+        return self.by_type[BISHOP]
+
+    @property
+    def rooks(self):
+        return self.by_type[ROOK]
+
+    @property
+    def queens(self):
+        return self.by_type[QUEEN]
+
+    @property
+    def kings(self):
+        return self.by_type[KING]
+
+    @property
+    def occupied(self):
+        return self.occupied_co[0] | self.occupied_co[1]
+
+    @property
+    def ply(self):
+        return len(self._stack)
+
+    def pieces_mask(self, piece_type, color):
+        return self.by_type[piece_type] & self.occupied_co[color]
+
+    def piece_type_at(self, square):
+        return self.pieces[square] or None
+
+    def piece_at(self, square):
+        ptype = self.pieces[square]
+        if not ptype:
+            return None
+        return chess.Piece(ptype, bool(self.occupied_co[WHITE] & BB_SQUARES[square]))
+
+    def fen(self):
+        return self.to_board().fen()
+
+    def king(self, color):
+        bb = self.by_type[KING] & self.occupied_co[color]
+        return bb.bit_length() - 1 if bb else None
+
+    # --- Tấn công / chiếu ---
+
+    def is_attacked_by(self, color, square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied_co[0] | self.occupied_co[1]
+        by_type = self.by_type
+        them = self.occupied_co[color]
+        if BB_KNIGHT_ATTACKS[square] & by_type[KNIGHT] & them:
+            return True
+        if BB_KING_ATTACKS[square] & by_type[KING] & them:
+            return True
+        if BB_PAWN_ATTACKS[not color][square] & by_type[PAWN] & them:
+            return True
+        queens = by_type[QUEEN]
+        if BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & (by_type[BISHOP] | queens) & them:
+            return True
+        rooks = (by_type[ROOK] | queens) & them
+        if rooks and (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied]
+                      | BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied]) & rooks:
+            return True
+        return False
+
+    def is_check(self):
+        king = self.by_type[KING] & self.occupied_co[self.turn]
+        return bool(king) and self.is_attacked_by(not self.turn, king.bit_length() - 1)
+
+    def was_legal(self):
+        # Gọi ngay sau push: Vua của bên vừa đi không được đang bị chiếu
+        mover = not self.turn
+        king = self.by_type[KING] & self.occupied_co[mover]
+        return not king or not self.is_attacked_by(self.turn, king.bit_length() - 1)
+
+    # --- Sinh nước đi (pseudo-legal: chưa loại nước để Vua bị chiếu) ---
+
+    def generate_moves(self, captures=True, quiets=True):
+        # captures: nước ăn quân (kể cả bắt tốt qua đường) và mọi nước phong cấp
+        # quiets  : các nước còn lại (kể cả nhập thành)
+        # Duyệt bit bằng vòng while trực tiếp (nhanh hơn generator) vì đây là hàm nóng nhất
+        moves = []
+        append = moves.append
+        turn = self.turn
+        by_type = self.by_type
+        pieces = self.pieces
+        us = self.occupied_co[turn]
+        them = self.occupied_co[not turn]
+        occupied = us | them
+        targets = 0
+        if captures:
+            targets |= them
+        if quiets:
+            targets |= ~occupied & BB_ALL
+
+        # Mã, Tượng, Xe, Hậu, Vua
+        pawns = by_type[PAWN] & us
+        bb = us & ~pawns
+        while bb:
+            lsb = bb & -bb
+            sq = lsb.bit_length() - 1
+            bb ^= lsb
+            ptype = pieces[sq]
+            if ptype == KNIGHT:
+                attacks = BB_KNIGHT_ATTACKS[sq]
+            elif ptype == BISHOP:
+                attacks = BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occupied]
+            elif ptype == ROOK:
+                attacks = (BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occupied]
+                           | BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occupied])
+            elif ptype == QUEEN:
+                attacks = (BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occupied]
+                           | BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occupied]
+                           | BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occupied])
+            else:
+                attacks = BB_KING_ATTACKS[sq]
+                if quiets and self.castling_rights & BB_BACKRANKS[turn]:
+                    self._generate_castling(sq, occupied, append)
+            attacks &= targets
+            while attacks:
+                lsb = attacks & -attacks
+                append(sq | (lsb.bit_length() - 1) << 6)
+                attacks ^= lsb
+
+        # Tốt
+        if pawns:
+            backrank = BB_BACKRANKS[not turn]  # hàng phong cấp của bên đi
+            if captures:
+                capture_targets = them
+                if self.ep_square is not None and not occupied & BB_SQUARES[self.ep_square]:
+                    capture_targets |= BB_SQUARES[self.ep_square]
+                pawn_attacks = BB_PAWN_ATTACKS[turn]
+                bb = pawns
+                while bb:
+                    lsb = bb & -bb
+                    sq = lsb.bit_length() - 1
+                    bb ^= lsb
+                    attacks = pawn_attacks[sq] & capture_targets
+                    while attacks:
+                        lsb = attacks & -attacks
+                        attacks ^= lsb
+                        move = sq | (lsb.bit_length() - 1) << 6
+                        if lsb & backrank:
+                            for promo in PROMOTIONS:
+                                append(move | promo << 12)
+                        else:
+                            append(move)
+
+            empty = ~occupied & BB_ALL
+            if turn == WHITE:
+                single = (pawns << 8) & empty
+                double = ((single & BB_PAWN_DOUBLE[turn]) << 8) & empty
+                delta = 8
+            else:
+                single = (pawns >> 8) & empty
+                double = ((single & BB_PAWN_DOUBLE[turn]) >> 8) & empty
+                delta = -8
+            # Phong cấp (kể cả không ăn quân) được xếp vào nhóm "captures"
+            if captures:
+                bb = single & backrank
+                while bb:
+                    lsb = bb & -bb
+                    bb ^= lsb
+                    to = lsb.bit_length() - 1
+                    for promo in PROMOTIONS:
+                        append((to - delta) | to << 6 | promo << 12)
+            if quiets:
+                bb = single & ~backrank
+                while bb:
+                    lsb = bb & -bb
+                    bb ^= lsb
+                    to = lsb.bit_length() - 1
+                    append((to - delta) | to << 6)
+                bb = double
+                while bb:
+                    lsb = bb & -bb
+                    bb ^= lsb
+                    to = lsb.bit_length() - 1
+                    append((to - 2 * delta) | to << 6)
+        return moves
+
+    def _generate_castling(self, king, occupied, append):
+        turn = self.turn
+        rights = self.castling_rights & BB_BACKRANKS[turn]
+        them = not turn
+        base = king & 56
+        if king != base + 4 or self.is_attacked_by(them, king, occupied):
+            return
+        if rights & BB_SQUARES[base + 7]:
+            if (not occupied & (BB_SQUARES[base + 5] | BB_SQUARES[base + 6])
+                    and not self.is_attacked_by(them, base + 5, occupied)
+                    and not self.is_attacked_by(them, base + 6, occupied)):
+                append(king | (base + 6) << 6)
+        if rights & BB_SQUARES[base]:
+            if (not occupied & (BB_SQUARES[base + 1] | BB_SQUARES[base + 2] | BB_SQUARES[base + 3])
+                    and not self.is_attacked_by(them, base + 3, occupied)
+                    and not self.is_attacked_by(them, base + 2, occupied)):
+                append(king | (base + 2) << 6)
+
+    def is_pseudo_legal(self, move):
+        # Nước lấy từ TT / killer có thể thuộc thế cờ khác: kiểm tra lại trước khi đi thử
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        turn = self.turn
+        us = self.occupied_co[turn]
+        from_bb = BB_SQUARES[frm]
+        to_bb = BB_SQUARES[to]
+        if not us & from_bb or us & to_bb or frm == to:
+            return False
+        ptype = self.pieces[frm]
+        occupied = us | self.occupied_co[not turn]
+
+        if ptype == PAWN:
+            if bool(promo) != bool(to_bb & BB_BACKRANKS[not turn]) or promo == KING:
+                return False
+            if BB_PAWN_ATTACKS[turn][frm] & to_bb:
+                return bool(self.occupied_co[not turn] & to_bb) or to == self.ep_square
+            step = 8 if turn == WHITE else -8
+            if to == frm + step:
+                return not occupied & to_bb
+            return (to == frm + 2 * step and bool(BB_SQUARES[frm + step] & BB_PAWN_DOUBLE[turn])
+                    and not occupied & (to_bb | BB_SQUARES[frm + step]))
+        if promo:
+            return False
+        if ptype == KNIGHT:
+            return bool(BB_KNIGHT_ATTACKS[frm] & to_bb)
+        if ptype == BISHOP:
+            return bool(BB_DIAG_ATTACKS[frm][BB_DIAG_MASKS[frm] & occupied] & to_bb)
+        if ptype == ROOK or ptype == QUEEN:
+            attacks = (BB_RANK_ATTACKS[frm][BB_RANK_MASKS[frm] & occupied]
+                       | BB_FILE_ATTACKS[frm][BB_FILE_MASKS[frm] & occupied])
+            if ptype == QUEEN:
+                attacks |= BB_DIAG_ATTACKS[frm][BB_DIAG_MASKS[frm] & occupied]
+            return bool(attacks & to_bb)
+        if BB_KING_ATTACKS[frm] & to_bb:
+            return True
+        if to - frm == 2 or frm - to == 2:
+            castling = []
+            if self.castling_rights & BB_BACKRANKS[turn]:
+                self._generate_castling(frm, occupied, castling.append)
+            return move in castling
+        return False
+
+    def pinned(self, king):
+        # Quân phe mình bị ghim vào Vua: đứng một mình giữa Vua và một quân trượt đối phương
+        by_type = self.by_type
+        us = self.occupied_co[self.turn]
+        them = self.occupied_co[not self.turn]
+        queens = by_type[QUEEN]
+        snipers = (((BB_RANK_ATTACKS[king][0] | BB_FILE_ATTACKS[king][0]) & (by_type[ROOK] | queens))
+                   | (BB_DIAG_ATTACKS[king][0] & (by_type[BISHOP] | queens))) & them
+        occupied = us | them
+        pinned = 0
+        while snipers:
+            lsb = snipers & -snipers
+            snipers ^= lsb
+            blockers = BB_BETWEEN[king][lsb.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers
+        return pinned & us
+
+    def checkers(self, king):
+        # Các quân đối phương đang chiếu Vua ở ô `king`
+        by_type = self.by_type
+        turn = self.turn
+        them = self.occupied_co[not turn]
+        occupied = self.occupied_co[0] | self.occupied_co[1]
+        queens = by_type[QUEEN]
+        return ((BB_KNIGHT_ATTACKS[king] & by_type[KNIGHT])
+                | (BB_PAWN_ATTACKS[turn][king] & by_type[PAWN])
+                | (BB_DIAG_ATTACKS[king][BB_DIAG_MASKS[king] & occupied] & (by_type[BISHOP] | queens))
+                | ((BB_RANK_ATTACKS[king][BB_RANK_MASKS[king] & occupied]
+                    | BB_FILE_ATTACKS[king][BB_FILE_MASKS[king] & occupied]) & (by_type[ROOK] | queens))) & them
+
+    def legal_moves(self):
+        # Như python-chess: dùng quân bị ghim và quân đang chiếu để lọc nước pseudo-legal,
+        # chỉ nước bắt tốt qua đường (có thể để lộ Vua theo hàng ngang) mới phải đi thử
+        moves = self.generate_moves()
+        turn = self.turn
+        king_bb = self.by_type[KING] & self.occupied_co[turn]
+        if not king_bb:
+            return moves
+        king = king_bb.bit_length() - 1
+        them = not turn
+
+        checkers = self.checkers(king)
+        if not checkers:
+            evasions = BB_ALL
+        elif checkers & (checkers - 1):
+            evasions = 0        # chiếu đôi: chỉ Vua được đi
+        else:
+            # Chiếu đơn: ăn quân đang chiếu hoặc chặn giữa nó và Vua
+            evasions = checkers | BB_BETWEEN[king][checkers.bit_length() - 1]
+
+        pinned = self.pinned(king)
+        occupied = (self.occupied_co[0] | self.occupied_co[1]) ^ king_bb
+        ep_square = self.ep_square
+        pieces = self.pieces
+        legal = []
+        for move in moves:
+            frm = move & 63
+            to = (move >> 6) & 63
+            if frm == king:
+                # Nhập thành đã được kiểm tra đủ điều kiện lúc sinh nước đi
+                if to - frm == 2 or frm - to == 2 or not self.is_attacked_by(them, to, occupied):
+                    legal.append(move)
+            elif to == ep_square and pieces[frm] == PAWN:
+                if self._legal_by_push(move):
+                    legal.append(move)
+            elif BB_SQUARES[to] & evasions and (not pinned & BB_SQUARES[frm] or BB_RAYS[frm][to] & king_bb):
+                legal.append(move)
+        return legal
+
+    def _legal_by_push(self, move):
+        self.push(move)
+        legal = self.was_legal()
+        self.pop()
+        return legal
+
+    def has_legal_move(self):
+        # Thường Vua có ngay một ô an toàn: khỏi phải sinh toàn bộ nước đi
+        turn = self.turn
+        king_bb = self.by_type[KING] & self.occupied_co[turn]
+        if king_bb:
+            king = king_bb.bit_length() - 1
+            occupied = (self.occupied_co[0] | self.occupied_co[1]) ^ king_bb
+            targets = BB_KING_ATTACKS[king] & ~self.occupied_co[turn]
+            while targets:
+                lsb = targets & -targets
+                if not self.is_attacked_by(not turn, lsb.bit_length() - 1, occupied):
+                    return True
+                targets ^= lsb
+        for move in self.generate_moves():
+            self.push(move)
+            legal = self.was_legal()
+            self.pop()
+            if legal:
+                return True
+        return False
+
+    def is_checkmate(self):
+        return self.is_check() and not self.has_legal_move()
+
+    def is_stalemate(self):
+        return not self.is_check() and not self.has_legal_move()
+
+    def is_capture(self, move):
+        to = (move >> 6) & 63
+        if self.pieces[to]:
+            return True
+        # Tốt đi vào ô bắt tốt qua đường (đang trống) luôn là nước bắt chéo
+        return to == self.ep_square and self.pieces[move & 63] == PAWN
+
+    def gives_check(self, move):
+        self.push(move)
+        check = self.is_check()
+        self.pop()
+        return check
+
+    def is_insufficient_material(self):
+        return self._insufficient(WHITE) and self._insufficient(BLACK)
+
+    def _insufficient(self, color):
+        by_type = self.by_type
+        us = self.occupied_co[color]
+        if us & (by_type[PAWN] | by_type[ROOK] | by_type[QUEEN]):
+            return False
+        if us & by_type[KNIGHT]:
+            return us.bit_count() <= 2 and not (self.occupied_co[not color] & ~by_type[KING] & ~by_type[QUEEN])
+        if us & by_type[BISHOP]:
+            bishops = by_type[BISHOP]
+            same_color = not bishops & chess.BB_DARK_SQUARES or not bishops & chess.BB_LIGHT_SQUARES
+            return same_color and not by_type[PAWN] and not by_type[KNIGHT]
+        return True
+
+    def repetition_count(self, limit=3):
+        # Số lần thế cờ hiện tại đã xuất hiện (tính cả lần này), dừng đếm khi đạt `limit`.
+        # Chỉ so key cách 2, 4, ... ply trong cửa sổ halfmove_clock và không vượt qua nước
+        # null, nên tốn O(halfmove_clock)
+        history = self.history
+        key = self.key
+        count = 1
+        stop = len(history) - self.halfmove_clock
+        i = len(history) - 2
+        while i >= stop and i >= 0:
+            previous = history[i]
+            if previous is None or history[i + 1] is None:
+                break
+            if previous == key:
+                count += 1
+                if count >= limit:
+                    break
+            i -= 2
+        return count
+
+    def is_repetition(self, count=3):
+        return self.repetition_count(count) >= count
+
+    def is_fifty_moves(self):
+        return self.halfmove_clock >= 100
+
+    def can_claim_draw(self):
+        # Như chess.Board.can_claim_draw: luật 50 nước hoặc lặp lại 3 lần, ở thế cờ hiện tại
+        # hoặc sau một nước đi của bên đang đi
+        return self.can_claim_fifty_moves() or self.can_claim_threefold_repetition()
+
+    def can_claim_fifty_moves(self):
+        if self.halfmove_clock >= 100:
+            return True
+        if self.halfmove_clock == 99:
+            # Một nước không ăn quân / không đi Tốt là đủ 50 nước
+            return any(not self.is_capture(move) and self.pieces[move & 63] != PAWN
+                       for move in self.legal_moves())
+        return False
+
+    def can_claim_threefold_repetition(self):
+        if self.repetition_count(3) >= 3:
+            return True
+        # Thế cờ sau một nước đi (không ăn quân / không đi Tốt) chỉ có thể lặp lại lần thứ ba
+        # nếu trong cửa sổ halfmove_clock đã có thế cờ cùng bên đi xuất hiện 2 lần: thường
+        # không có nên không phải sinh nước đi
+        history = self.history
+        stop = max(len(history) - self.halfmove_clock, 0)
+        seen = set()
+        repeated = False
+        i = len(history) - 1
+        while i >= stop:
+            key = history[i]
+            if key is None or (i + 1 < len(history) and history[i + 1] is None):
+                break
+            if key in seen:
+                repeated = True
+                break
+            seen.add(key)
+            i -= 2
+        if not repeated:
+            return False
+        for move in self.legal_moves():
+            self.push(move)
+            count = self.repetition_count(3)
+            self.pop()
+            if count >= 3:
+                return True
+        return False
+
+    def _ep_key(self):
+        # Giống chess.polyglot: chỉ tính ô bắt tốt qua đường khi có Tốt đứng cạnh để bắt
+        ep = self.ep_square
+        if ep is None:
+            return 0
+        if BB_PAWN_ATTACKS[not self.turn][ep] & self.by_type[PAWN] & self.occupied_co[self.turn]:
+            return EP_KEYS[ep & 7]
+        return 0
+
+    # --- Make / unmake ---
+
+    def push(self, move):
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        pieces = self.pieces
+        by_type = self.by_type
+        occ = self.occupied_co
+        turn = self.turn
+        them = not turn
+        ptype = pieces[frm]
+        captured = pieces[to]
+        rights = self.castling_rights
+
+        self._stack.append((move, captured, self.castling_rights, self.ep_square, self.halfmove_clock,
+                            self.key, self.mg, self.eg, self.phase, self.pawn_key))
+        self.history.append(self.key)
+
+        key = self.key ^ self._ep_key() ^ TURN_KEY
+        from_bb = BB_SQUARES[frm]
+        to_bb = BB_SQUARES[to]
+        new_type = promo or ptype
+        our_keys = PIECE_KEYS[turn]
+        key ^= our_keys[ptype][frm] ^ our_keys[new_type][to]
+
+        track_eval = self.mg_psq is not None
+        if track_eval:
+            mg_us = self.mg_psq[turn]
+            eg_us = self.eg_psq[turn]
+            mg = self.mg - mg_us[ptype][frm] + mg_us[new_type][to]
+            eg = self.eg - eg_us[ptype][frm] + eg_us[new_type][to]
+            phase = self.phase + self.phase_weight[new_type] - self.phase_weight[ptype]
+
+        pkey = self.pawn_key
+        ep_square = None
+        halfmove = self.halfmove_clock + 1
+
+        if captured:
+            by_type[captured] ^= to_bb
+            occ[them] ^= to_bb
+            key ^= PIECE_KEYS[them][captured][to]
+            if track_eval:
+                mg -= self.mg_psq[them][captured][to]
+                eg -= self.eg_psq[them][captured][to]
+                phase -= self.phase_weight[captured]
+            if captured == PAWN:
+                pkey ^= PIECE_KEYS[them][PAWN][to]
+            halfmove = 0
+
+        by_type[ptype] ^= from_bb
+        by_type[new_type] |= to_bb
+        occ[turn] ^= from_bb | to_bb
+        pieces[frm] = 0
+        pieces[to] = new_type
+
+        if ptype == PAWN:
+            halfmove = 0
+            pkey ^= our_keys[PAWN][frm]
+            if not promo:
+                pkey ^= our_keys[PAWN][to]
+            diff = to - frm
+            if diff == 16 or diff == -16:
+                ep_square = (frm + to) >> 1
+            elif not captured and diff != 8 and diff != -8:
+                # Bắt tốt qua đường: Tốt bị bắt nằm sau ô đến
+                cap_sq = to ^ 8
+                cap_bb = BB_SQUARES[cap_sq]
+                by_type[PAWN] ^= cap_bb
+                occ[them] ^= cap_bb
+                pieces[cap_sq] = 0
+                key ^= PIECE_KEYS[them][PAWN][cap_sq]
+                pkey ^= PIECE_KEYS[them][PAWN][cap_sq]
+                if track_eval:
+                    mg -= self.mg_psq[them][PAWN][cap_sq]
+                    eg -= self.eg_psq[them][PAWN][cap_sq]
+        elif ptype == KING:
+            rights &= ~BB_BACKRANKS[turn]
+            diff = to - frm
+            if diff == 2 or diff == -2:
+                base = frm & 56
+                if diff == 2:
+                    rook_from, rook_to = base + 7, base + 5
+                else:
+                    rook_from, rook_to = base, base + 3
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                by_type[ROOK] ^= rook_bb
+                occ[turn] ^= rook_bb
+                pieces[rook_from] = 0
+                pieces[rook_to] = ROOK
+                key ^= our_keys[ROOK][rook_from] ^ our_keys[ROOK][rook_to]
+                if track_eval:
+                    mg += mg_us[ROOK][rook_to] - mg_us[ROOK][rook_from]
+                    eg += eg_us[ROOK][rook_to] - eg_us[ROOK][rook_from]
+
+        rights &= ~(from_bb | to_bb)
+        if rights != self.castling_rights:
+            key ^= CASTLING_KEYS[_castling_index(self.castling_rights)] ^ CASTLING_KEYS[_castling_index(rights)]
+            self.castling_rights = rights
+
+        self.turn = them
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove
+        self.pawn_key = pkey
+        if track_eval:
+            self.mg = mg
+            self.eg = eg
+            self.phase = phase
+        self.key = key ^ self._ep_key()
+
+    def pop(self):
+        (move, captured, self.castling_rights, self.ep_square, self.halfmove_clock,
+         self.key, self.mg, self.eg, self.phase, self.pawn_key) = self._stack.pop()
+        self.history.pop()
+        if not move:
+            self.turn = not self.turn
+            return
+
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        pieces = self.pieces
+        by_type = self.by_type
+        occ = self.occupied_co
+        them = self.turn
+        turn = not them
+        self.turn = turn
+
+        new_type = pieces[to]
+        ptype = PAWN if promo else new_type
+        from_bb = BB_SQUARES[frm]
+        to_bb = BB_SQUARES[to]
+
+        by_type[new_type] ^= to_bb
+        by_type[ptype] |= from_bb
+        occ[turn] ^= from_bb | to_bb
+        pieces[frm] = ptype
+        pieces[to] = captured
+
+        if captured:
+            by_type[captured] |= to_bb
+            occ[them] |= to_bb
+        elif ptype == PAWN and (to - frm) & 7:
+            cap_sq = to ^ 8
+            cap_bb = BB_SQUARES[cap_sq]
+            by_type[PAWN] |= cap_bb
+            occ[them] |= cap_bb
+            pieces[cap_sq] = PAWN
+        elif ptype == KING and (to - frm == 2 or frm - to == 2):
+            base = frm & 56
+            if to > frm:
+                rook_from, rook_to = base + 7, base + 5
+            else:
+                rook_from, rook_to = base, base + 3
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            by_type[ROOK] ^= rook_bb
+            occ[turn] ^= rook_bb
+            pieces[rook_to] = 0
+            pieces[rook_from] = ROOK
+
+    def push_null(self):
+        self._stack.append((0, 0, self.castling_rights, self.ep_square, self.halfmove_clock,
+                            self.key, self.mg, self.eg, self.phase, self.pawn_key))
+        self.history.append(None)
+        self.key ^= self._ep_key() ^ TURN_KEY
+        self.ep_square = None
+        self.halfmove_clock += 1
+        self.turn = not self.turn
+
+
+def perft(board, depth):
+    # Đếm số nút lá ở độ sâu `depth`, dùng để kiểm tra bộ sinh nước đi và make/unmake
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
@@ -0,0 +1,53 @@
+# agents/evaluation.py
+import chess
+
+
+class BitboardEvaluator:
+    # Tính (điểm MG, điểm EG, phase) trực tiếp từ bitboard của python-chess.
+    # Giá trị quân được cộng sẵn vào PST, bảng của quân Đen được lật và đổi dấu sẵn,
+    # nên mỗi (phe, loại quân) chỉ cần một vòng duyệt qua các bit 1 của bitboard.
+    # Điểm luôn tính theo góc nhìn phe Trắng.
+
+    def __init__(self, mg_value, eg_value, tables, phase_weights):
+        # psq[color][ptype][square] = ±(giá trị quân + điểm PST)
+        self.mg_psq = [[None] * 7, [None] * 7]
+        self.eg_psq = [[None] * 7, [None] * 7]
+        for ptype in chess.PIECE_TYPES:
+            for color in chess.COLORS:
+                sign = 1 if color == chess.WHITE else -1
+                mg_row = []
+                eg_row = []
+                for sq in range(64):
+                    idx = sq if color == chess.WHITE else chess.square_mirror(sq)
+                    mg_row.append(sign * (mg_value[ptype] + tables['MG'][ptype][idx]))
+                    eg_row.append(sign * (eg_value[ptype] + tables['EG'][ptype][idx]))
+                self.mg_psq[color][ptype] = mg_row
+                self.eg_psq[color][ptype] = eg_row
+
+        self.phase_weight = [0] * 7
+        for ptype, weight in phase_weights.items():
+            self.phase_weight[ptype] = weight
+
+    def compute(self, board):
+        mg = 0
+        eg = 0
+        phase = 0
+        piece_bbs = (None, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+        for color in chess.COLORS:
+            occ = board.occupied_co[color]
+            mg_side = self.mg_psq[color]
+            eg_side = self.eg_psq[color]
+            for ptype in chess.PIECE_TYPES:
+                bb = piece_bbs[ptype] & occ
+                if not bb:
+                    continue
+                phase += self.phase_weight[ptype] * bb.bit_count()
+                mg_table = mg_side[ptype]
+                eg_table = eg_side[ptype]
+                while bb:
+                    lsb = bb & -bb
+                    sq = lsb.bit_length() - 1
+                    mg += mg_table[sq]
+                    eg += eg_table[sq]
+                    bb ^= lsb
+        return mg, eg, phase
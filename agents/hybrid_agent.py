@@ -0,0 +1,178 @@
+# agents/hybrid_agent.py
+import os
+import sys
+
+import chess
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import board_to_array
+
+from training.model_mlp import ChessMLP_Scratch, xp
+from agents.minimax_agent import MinimaxAgent, MATE_SCORE, INF
+from agents.transposition_table import EXACT, LOWER, UPPER
+
+# Đầu ra Tanh của MLP nằm trong [-1, 1] (góc nhìn quân Trắng), nhân hệ số này để
+# cùng thang centipawn với điểm chiếu hết / điểm hoà của search
+MLP_SCORE_SCALE = 1000
+
+
+class HybridAgent(MinimaxAgent):
+    # Alpha-beta của MinimaxAgent nhưng node lá được chấm bằng MLP (ChessMLP_Scratch).
+    # Ở node cách lá 1 ply (frontier), các nước con được mã hoá vào cùng một batch và
+    # đánh giá bằng một lần forward, thay vì một lần forward 832 chiều cho mỗi node:
+    # phép nhân ma trận (B, 832) x (832, 1024) dùng BLAS hiệu quả hơn hẳn B phép nhân vector.
+    # batch_size=1 là chế độ đánh giá từng node (để so sánh NPS).
+
+    def __init__(self, model_path='training/best_model_mlp.npz', batch_size=16, depth=3, **kwargs):
+        # MLP chậm hơn PST nhiều: mặc định tắt quiescence và các kỹ thuật cần điểm tĩnh
+        # ở node trong (null-move, futility), đánh giá tăng dần PST cũng không cần nữa
+        kwargs.setdefault('use_quiescence', False)
+        kwargs.setdefault('use_null_move', False)
+        kwargs.setdefault('use_futility', False)
+        kwargs.setdefault('incremental_eval', False)
+        super().__init__(depth=depth, **kwargs)
+
+        self.batch_size = max(1, int(batch_size))
+        self._leaf_buffer = np.zeros((self.batch_size, 13, 8, 8), dtype=np.float32)
+
+        # Chế độ chỉ suy luận: weights float32, buffer activation theo batch_size, dựng lại
+        # từ model hiện tại khi cần (xem thuộc tính engine)
+        self.load_weights(model_path)
+
+    @property
+    def model(self):
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Gán model mới (đã load sẵn weights): engine cũ bị bỏ, dựng lại ở lần forward sau
+        self._model = model
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None and self._model is not None:
+            self._engine = self._model.inference_engine(self.batch_size)
+        return self._engine
+
+    def load_weights(self, model_path):
+        # Load (lại) weights từ file .npz; model = None nếu không load được
+        model = ChessMLP_Scratch()
+        try:
+            if os.path.exists(model_path):
+                model.load_weights(model_path)
+                print(f"[HybridAgent] Đã load weights thành công từ {model_path}")
+            else:
+                print(f"[HybridAgent] CẢNH BÁO: Không tìm thấy file {model_path}, dùng hàm đánh giá PST")
+                model = None
+        except Exception as e:
+            print(f"[HybridAgent] LỖI load model: {e}")
+            model = None
+        self.model = model
+
+    def _forward(self, count):
+        # Đánh giá `count` thế cờ đầu của _leaf_buffer, trả về điểm góc nhìn quân Trắng
+        output = self.engine.forward(xp.asarray(self._leaf_buffer[:count]))
+        if xp.__name__ == 'cupy':
+            output = xp.asnumpy(output)
+        return output.reshape(-1) * MLP_SCORE_SCALE
+
+    def _terminal_score(self, board):
+        # Điểm theo góc nhìn quân Trắng nếu ván đã kết thúc, None nếu chưa
+        if board.is_checkmate():
+            return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+        if board.is_stalemate() or board.is_insufficient_material():
+            return 0
+        return None
+
+    def evaluate_board(self, board):
+        if self.model is None:
+            return super().evaluate_board(board)
+
+        score = self._terminal_score(board)
+        if score is not None:
+            return score
+        board_to_array(board, self._leaf_buffer[0])
+        return int(self._forward(1)[0])
+
+    def negamax(self, board, depth, alpha, beta, ply=1, allow_null=True):
+        if depth != 1 or self.batch_size == 1 or self.model is None:
+            return super().negamax(board, depth, alpha, beta, ply, allow_null)
+        return self._frontier(board, alpha, beta, ply)
+
+    def _frontier(self, board, alpha, beta, ply):
+        # Node depth 1: các nước con (đã sắp xếp) được đánh giá theo từng batch rồi lấy max
+        # (negamax). Cắt tỉa theo batch: sau mỗi batch, nếu đã có nước >= beta thì bỏ qua
+        # các batch còn lại. batch_size nhỏ cắt tỉa được nhiều hơn, lớn thì forward nhanh hơn.
+        self.nodes += 1
+        if self._limits_active and self.nodes >= self._next_check:
+            self._check_limits()
+        self._pv_table[ply] = []
+
+        if self._is_draw(board):
+            return 0
+
+        key = None
+        tt_move = 0
+        alpha_orig = alpha
+        if self.tt is not None:
+            key = board.key
+            entry = self.tt.probe(key)
+            if entry is not None:
+                tt_depth, tt_flag, tt_score, tt_move = entry
+                if tt_depth >= 1 and beta - alpha == 1:
+                    if tt_flag == EXACT:
+                        return tt_score
+                    if tt_flag == LOWER and tt_score >= beta:
+                        return tt_score
+                    if tt_flag == UPPER and tt_score <= alpha:
+                        return tt_score
+
+        moves = board.legal_moves()
+        if not moves or board.is_insufficient_material():
+            return self._evaluate_side(board)
+
+        moves = self.move_orderer.order(board, moves, ply, tt_move)
+        sign = 1 if board.turn == chess.WHITE else -1
+        best_move = 0
+        best_value = -INF
+
+        for start in range(0, len(moves), self.batch_size):
+            chunk = moves[start:start + self.batch_size]
+            scores = [0] * len(chunk)
+            pending = []
+            for i, move in enumerate(chunk):
+                board.push(move)
+                terminal = 0 if self._is_draw(board) else self._terminal_score(board)
+                if terminal is None:
+                    board_to_array(board, self._leaf_buffer[len(pending)])
+                    pending.append(i)
+                else:
+                    scores[i] = terminal * sign
+                board.pop()
+
+            if pending:
+                values = self._forward(len(pending))
+                for i, value in zip(pending, values):
+                    scores[i] = int(value) * sign
+
+            self.nodes += len(chunk)
+            self.leaf_evals += len(chunk)
+
+            index = max(range(len(chunk)), key=scores.__getitem__)
+            if scores[index] > best_value:
+                best_value = scores[index]
+                best_move = chunk[index]
+                if best_value > alpha:
+                    alpha = best_value
+                    self._pv_table[ply] = [best_move]
+                    if alpha >= beta:
+                        self.move_orderer.record_cutoff(board, best_move, ply, 1, start + index, tt_move)
+                        break
+
+        if self._limits_active and self.nodes >= self._next_check:
+            self._check_limits()
+        if key is not None:
+            self._store(key, 1, best_value, alpha_orig, beta, best_move)
+        return best_value
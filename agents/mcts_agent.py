@@ -0,0 +1,284 @@
+# agents/mcts_agent.py
+import math
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import board_to_array
+
+from training.model_mlp import ChessMLP_Scratch, xp
+from agents.compact_board import CompactBoard
+from agents.search_stats import SearchStats
+from agents.transposition_table import board_key, encode_move, decode_move
+
+# Hằng số khám phá của UCT (giá trị node nằm trong [-1, 1])
+UCT_C = 1.2
+# Virtual loss: mỗi node trên đường đi đang chờ forward được tính thêm VIRTUAL_LOSS lượt
+# thăm "thua", để các lần mô phỏng sau trong cùng batch rẽ sang nhánh khác
+VIRTUAL_LOSS = 1
+# Số nước đã đi trong ván kể từ lần search trước mà cây vẫn được dùng lại
+# (nước của agent + nước trả lời của đối thủ)
+REUSE_PLIES = 2
+
+
+class Node:
+    __slots__ = ('move', 'parent', 'children', 'visits', 'value_sum', 'terminal')
+
+    def __init__(self, move, parent):
+        self.move = move            # nước đi (số nguyên, encode_move) dẫn tới node
+        self.parent = parent
+        self.children = None        # None = chưa mở rộng
+        self.visits = 0
+        self.value_sum = 0.0        # tổng giá trị theo góc nhìn bên vừa đi nước `move`
+        self.terminal = None        # ván kết thúc ở node: giá trị theo góc nhìn bên đến lượt
+
+
+class MCTSAgent:
+    # Monte Carlo Tree Search (UCT) dùng ChessMLP_Scratch làm hàm đánh giá node lá.
+    # Mỗi vòng chọn `batch_size` lá bằng virtual loss, mã hoá vào một buffer có sẵn và
+    # đánh giá bằng một lần forward cho cả batch. Cây con của nước vừa đi được giữ lại
+    # cho lần select_move sau. Ngân sách: số lần mô phỏng (simulations) và/hoặc thời gian.
+
+    def __init__(self, model_path='training/best_model_mlp.npz', simulations=800, time_limit=None,
+                 batch_size=16, c_uct=UCT_C, reuse_tree=True, collect_stats=False):
+        if simulations is None and not time_limit:
+            raise ValueError("MCTSAgent cần simulations hoặc time_limit")
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.batch_size = max(1, int(batch_size))
+        self.c_uct = c_uct
+        self.reuse_tree = reuse_tree
+        self._leaf_buffer = np.zeros((self.batch_size, 13, 8, 8), dtype=np.float32)
+
+        # Chế độ chỉ suy luận: weights float32, buffer activation theo batch_size, dựng lại
+        # từ model hiện tại khi cần (xem thuộc tính engine)
+        self.load_weights(model_path)
+
+        # Cây của lần search trước: (Zobrist key của root, node root)
+        self._tree = None
+
+        # Thống kê của lần select_move gần nhất
+        self.nodes = 0              # số lần mô phỏng (kể cả lá là thế cờ kết thúc)
+        self.leaf_evals = 0         # số thế cờ đã đưa qua MLP
+        self.forward_calls = 0
+        self.reused_visits = 0      # số lượt thăm có sẵn ở root nhờ dùng lại cây
+        self.search_time = 0.0
+        self.pv = []
+        self.score = 0.0            # giá trị trung bình của nước được chọn, góc nhìn bên đi
+        self.collect_stats = collect_stats
+        self.last_stats = None
+
+    @property
+    def model(self):
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Gán model mới (đã load sẵn weights): engine cũ bị bỏ, dựng lại ở lần forward sau
+        self._model = model
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None and self._model is not None:
+            self._engine = self._model.inference_engine(self.batch_size)
+        return self._engine
+
+    def load_weights(self, model_path):
+        # Load (lại) weights từ file .npz; model = None nếu không load được
+        model = ChessMLP_Scratch()
+        try:
+            if os.path.exists(model_path):
+                model.load_weights(model_path)
+                print(f"[MCTSAgent] Đã load weights thành công từ {model_path}")
+            else:
+                print(f"[MCTSAgent] CẢNH BÁO: Không tìm thấy file {model_path}")
+                model = None
+        except Exception as e:
+            print(f"[MCTSAgent] LỖI load model: {e}")
+            model = None
+        self.model = model
+
+    @property
+    def leaves_per_second(self):
+        return self.leaf_evals / self.search_time if self.search_time > 0 else 0.0
+
+    def new_game(self):
+        self._tree = None
+
+    def select_move(self, board, time_limit=None, node_limit=None):
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            return None
+        if self.model is None:
+            return random.choice(legal_moves)
+
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.simulations
+        # node_limit None = không giới hạn số mô phỏng, chỉ dừng theo thời gian
+        if node_limit is None and not time_limit:
+            raise ValueError("MCTSAgent cần simulations/node_limit hoặc time_limit")
+
+        start_time = time.time()
+        deadline = start_time + time_limit if time_limit else None
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.forward_calls = 0
+
+        root = self._reuse_root(board) if self.reuse_tree else None
+        if root is None:
+            root = Node(0, None)
+        self.reused_visits = root.visits
+
+        cb = CompactBoard.from_board(board)
+        if root.children is None:
+            # Root luôn được mở rộng, kể cả khi đã đủ điều kiện xin hoà (ván vẫn tiếp tục)
+            self._add_children(root, cb, cb.legal_moves())
+        while node_limit is None or self.nodes < node_limit:
+            count = self.batch_size if node_limit is None else min(self.batch_size, node_limit - self.nodes)
+            self._run_batch(root, cb, count)
+            if deadline is not None and time.time() >= deadline:
+                break
+
+        best = max(root.children, key=lambda child: child.visits)
+        self.score = best.value_sum / best.visits if best.visits else 0.0
+        self.pv = self._principal_variation(root)
+        self.search_time = time.time() - start_time
+        self._tree = (board_key(board), root)
+        self._record_stats()
+        return decode_move(best.move)
+
+    def _run_batch(self, root, cb, count):
+        # Chọn tối đa `count` lá (áp virtual loss trên đường đi), đánh giá chung một lần forward
+        pending = []
+        for _ in range(count):
+            self.nodes += 1
+            node = root
+            path = [root]
+            while node.children:
+                node = self._select_child(node)
+                cb.push(node.move)
+                path.append(node)
+
+            if node.children is None and node.terminal is None:
+                self._expand(node, cb)
+
+            if node.terminal is not None:
+                self._backup(path, node.terminal, 0)
+            else:
+                board_to_array(cb, self._leaf_buffer[len(pending)])
+                pending.append((path, 1 if cb.turn == chess.WHITE else -1))
+                for visited in path:
+                    visited.visits += VIRTUAL_LOSS
+                    visited.value_sum -= VIRTUAL_LOSS
+
+            for _ in range(len(path) - 1):
+                cb.pop()
+
+        if pending:
+            values = self._forward(len(pending))
+            for (path, sign), value in zip(pending, values):
+                self._backup(path, float(value) * sign, VIRTUAL_LOSS)
+
+    def _expand(self, node, cb):
+        # Thế cờ kết thúc thì ghi giá trị cố định, ngược lại tạo các node con
+        if cb.is_fifty_moves() or cb.is_insufficient_material() or cb.is_repetition(2):
+            # Luật 50 nước / không đủ quân chiếu hết / lặp lại thế cờ (trong ván hoặc
+            # trong nhánh, tra lịch sử Zobrist key của CompactBoard): coi như hoà
+            node.terminal = 0.0
+            return
+        moves = cb.legal_moves()
+        if not moves:
+            node.terminal = -1.0 if cb.is_check() else 0.0
+            return
+        self._add_children(node, cb, moves)
+
+    def _add_children(self, node, cb, moves):
+        # Node con chưa thăm được thử theo thứ tự: nước ăn quân / phong cấp trước
+        moves.sort(key=lambda m: not (m >> 12 or cb.is_capture(m)))
+        node.children = [Node(move, node) for move in moves]
+
+    def _select_child(self, node):
+        # UCT: Q (góc nhìn bên đến lượt ở node) + c * sqrt(ln N / n), node con chưa thăm trước
+        log_visits = math.log(node.visits) if node.visits > 1 else 0.0
+        c = self.c_uct
+        best = None
+        best_score = -math.inf
+        for child in node.children:
+            visits = child.visits
+            if not visits:
+                return child
+            score = child.value_sum / visits + c * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_score = score
+                best = child
+        return best
+
+    def _backup(self, path, value, virtual_loss):
+        # value: giá trị của lá theo góc nhìn bên đến lượt ở lá, đổi dấu qua mỗi ply
+        for node in reversed(path):
+            value = -value
+            node.visits += 1 - virtual_loss
+            node.value_sum += value + virtual_loss
+
+    def _forward(self, count):
+        # Điểm Tanh của `count` thế cờ đầu trong _leaf_buffer, theo góc nhìn quân Trắng
+        output = self.engine.forward(xp.asarray(self._leaf_buffer[:count]))
+        if xp.__name__ == 'cupy':
+            output = xp.asnumpy(output)
+        self.forward_calls += 1
+        self.leaf_evals += count
+        return output.reshape(-1)
+
+    def _reuse_root(self, board):
+        # Tìm trong cây cũ node ứng với thế cờ hiện tại (lùi tối đa REUSE_PLIES nước)
+        if self._tree is None:
+            return None
+        key, root = self._tree
+        self._tree = None
+        replay = board.copy()
+        moves = []
+        while True:
+            if board_key(replay) == key:
+                break
+            if len(moves) >= REUSE_PLIES or not replay.move_stack:
+                return None
+            moves.append(replay.pop())
+
+        node = root
+        for move in reversed(moves):
+            code = encode_move(move)
+            node = next((child for child in node.children or () if child.move == code), None)
+            if node is None:
+                return None
+        if node.children is None:
+            return None
+        node.parent = None
+        return node
+
+    def _principal_variation(self, root):
+        pv = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            if not node.visits:
+                break
+            pv.append(decode_move(node.move))
+        return pv
+
+    def _record_stats(self):
+        if not self.collect_stats:
+            return
+        stats = SearchStats('mcts')
+        stats.time = self.search_time
+        stats.nodes = self.nodes
+        stats.leaf_evals = self.leaf_evals
+        stats.completed_depth = len(self.pv)
+        self.last_stats = stats
@@ -1,264 +1,1057 @@
 import chess
-import math
+import threading
+import time
+
+from agents.compact_board import CompactBoard
+from agents.evaluation import BitboardEvaluator
+from agents.move_ordering import MoveOrderer
+from agents.opening_book import OpeningBook
+from agents.parallel_search import RootSplitPool
+from agents.pawn_structure import PawnHashTable, pawn_key
+from agents.search_stats import SearchStats
+from agents.tablebase import SyzygyTablebase
+from agents.transposition_table import TranspositionTable, board_key, encode_move, decode_move, EXACT, LOWER, UPPER
+
+MATE_SCORE = 99999
+INF = 1000000
+
+# Điểm thế thắng theo tablebase (trừ đi ply để ưu tiên thắng sớm), thấp hơn hẳn điểm chiếu hết
+TB_WIN_SCORE = 50000
+
+# Nửa độ rộng ban đầu của aspiration window quanh điểm vòng trước (centipawn),
+# vượt quá ASPIRATION_MAX thì mở hẳn về vô cực
+ASPIRATION_WINDOW = 50
+ASPIRATION_MAX = 400
+
+# Null-move pruning: độ giảm R và độ sâu tối thiểu để thử
+NULL_MOVE_R = 2
+NULL_MOVE_MIN_DEPTH = 3
+
+# Late move reductions: chỉ giảm nước yên tĩnh đứng từ vị trí LMR_MIN_INDEX trở đi
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+
+# Futility pruning: biên theo depth còn lại (chỉ áp dụng cho depth 1, 2)
+FUTILITY_MARGINS = (0, 200, 500)
+
+# Độ sâu tối đa của bảng PV (đủ cho cả nhánh search chính)
+MAX_PLY = 128
+
+# Biên an toàn cho delta pruning trong quiescence search (centipawn)
+DELTA_MARGIN = 200
+
+# Số node giữa hai lần kiểm tra giới hạn thời gian/node
+CHECK_INTERVAL = 256
+
+
+# Giá trị quân, trọng số phase và bảng PST (Piece-Square Table) theo góc nhìn quân Trắng,
+# dùng chung cho mọi MinimaxAgent (không dựng lại ở mỗi instance)
+MG_VALUE = {
+    chess.PAWN: 82, chess.KNIGHT: 337, chess.BISHOP: 365,
+    chess.ROOK: 477, chess.QUEEN: 1025, chess.KING: 0
+}
+EG_VALUE = {
+    chess.PAWN: 94, chess.KNIGHT: 281, chess.BISHOP: 297,
+    chess.ROOK: 512, chess.QUEEN: 936, chess.KING: 0
+}
+
+PHASE_WEIGHTS = {
+    chess.KNIGHT: 1,
+    chess.BISHOP: 1,
+    chess.ROOK: 2,
+    chess.QUEEN: 4
+}
+TOTAL_PHASE = 24
+
+######### Bảng điểm trung cuộc ##################
+# Tốt MG:
+# - Khuyến khích chiếm/giữ trung tâm (d4, e4, d5, e5)
+# - Hàng 2 (ban đầu) có bonus nhẹ để hỗ trợ phát triển
+# - Các ô quá cao ở MG chưa cần đẩy mạnh nên không thưởng lớn
+MG_PAWN = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+     5,  5, 10, 25, 25, 10,  5,  5,
+     0,  0,  0, 20, 20,  0,  0,  0,
+     5, -5,-10,  0,  0,-10, -5,  5,
+     5, 10, 10,-20,-20, 10, 10,  5,
+     0,  0,  0,  0,  0,  0,  0,  0
+]
+
+# Mã MG:
+# - Bonus lớn ở trung tâm vì nhiều nước đi nhất và kiểm soát tốt ô quan trọng
+# - Phạt ở biên/góc vì bị hạn chế tầm hoạt động
+MG_KNIGHT = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50
+]
+
+# Tượng MG:
+# - Tránh góc/bị kẹt
+# - Ưu tiên ô mở ra đường chéo dài, kiểm soát trung tâm từ xa
+MG_BISHOP = [
+    -20,-10,-10,-10,-10,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  5,  5, 10, 10,  5,  5,-10,
+    -10,  0, 10, 10, 10, 10,  0,-10,
+    -10, 10, 10, 10, 10, 10, 10,-10,
+    -10,  5,  0,  0,  0,  0,  5,-10,
+    -20,-10,-10,-10,-10,-10,-10,-20
+]
+
+# Xe MG:
+# - PST ít ảnh hưởng hơn vì Xe phụ thuộc mạnh vào cấu trúc động:
+#   cột mở, hàng 7, chiếm file.
+# - Bảng chỉ thưởng nhẹ cho hàng 2 (tiếp cận hàng 7 địch)
+MG_ROOK = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+     5, 10, 10, 10, 10, 10, 10,  5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+     0,  0,  0,  5,  5,  0,  0,  0
+]
+
+# Hậu MG:
+# - Phạt nhẹ việc ra quá sớm (hàng 1-2) vì dễ bị tempo đuổi
+# - Thưởng nhẹ trung tâm khi đã phát triển
+MG_QUEEN = [
+    -20,-10,-10, -5, -5,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+     -5,  0,  5,  5,  5,  5,  0, -5,
+      0,  0,  5,  5,  5,  5,  0, -5,
+    -10,  5,  5,  5,  5,  5,  0,-10,
+    -10,  0,  5,  0,  0,  0,  0,-10,
+    -20,-10,-10, -5, -5,-10,-10,-20
+]
+
+# Vua MG:
+# - Mục tiêu trung cuộc là an toàn: nhập thành, tránh trung tâm.
+# - Vua ở trung tâm bị phạt rất nặng.
+# - Hàng 1 góc (g1/c1) được thưởng do an toàn hơn.
+MG_KING = [
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -20,-30,-30,-40,-40,-30,-30,-20,
+    -10,-20,-20,-20,-20,-20,-20,-10,
+     20, 20,  0,  0,  0,  0, 20, 20,
+     20, 30, 10,  0,  0, 10, 30, 20
+]
+
+EG_PAWN = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    20, 20, 20, 20, 20, 20, 20, 20,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    10, 10, 10, 10, 10, 10, 10, 10,
+     0,  0,  0,  0,  0,  0,  0,  0
+]
+
+######### Bảng điểm tàn cuộc ##################
+# Mã EG:
+# - Thường không thay đổi nhiều so với MG (vẫn là quân tầm ngắn)
+EG_KNIGHT = MG_KNIGHT
+
+# Tượng EG:
+# - Dùng chung MG vì nguyên tắc đường chéo dài vẫn giữ.
+EG_BISHOP = MG_BISHOP
+
+# Xe EG:
+# - Cũng phụ thuộc mạnh vào file/hàng mở nên PST giữ gần MG.
+EG_ROOK = MG_ROOK
+
+# Hậu EG:
+# - Ít bị phạt ra sớm nữa.
+# - Thưởng rõ hơn ở trung tâm để phản ánh vai trò “quân đa năng”.
+EG_QUEEN = [
+    -10,-10,-10,-10,-10,-10,-10,-10,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,-10,-10,-10,-10,-10,-10,-10
+]
+
+# Vua EG:
+# - Nguyên tắc tàn cuộc: Vua phải chủ động, đi ra giữa.
+# - Trung tâm có bonus lớn vì giúp:
+#   + cản tốt đối phương
+#   + hộ tống tốt phong cấp
+#   + chiếm không gian
+EG_KING = [
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50
+]
+
+PST_TABLES = {
+    'MG': {
+        chess.PAWN: MG_PAWN,
+        chess.KNIGHT: MG_KNIGHT,
+        chess.BISHOP: MG_BISHOP,
+        chess.ROOK: MG_ROOK,
+        chess.QUEEN: MG_QUEEN,
+        chess.KING: MG_KING
+    },
+    'EG': {
+        chess.PAWN: EG_PAWN,
+        chess.KNIGHT: EG_KNIGHT,
+        chess.BISHOP: EG_BISHOP,
+        chess.ROOK: EG_ROOK,
+        chess.QUEEN: EG_QUEEN,
+        chess.KING: EG_KING
+    }
+}
+
+# Bảng đã gộp giá trị quân + PST và lật sẵn cho quân Đen (chỉ đọc, dùng chung)
+EVALUATOR = BitboardEvaluator(MG_VALUE, EG_VALUE, PST_TABLES, PHASE_WEIGHTS)
+
+
+class SearchAborted(Exception):
+    # Dừng search giữa chừng khi hết thời gian hoặc hết số node cho phép
+    pass
+
 
 class MinimaxAgent:
-    def __init__(self, depth=3):
+    def __init__(self, depth=3, use_tt=True, tt_size_mb=16, time_limit=None, node_limit=None,
+                 move_orderer=None, use_quiescence=True, incremental_eval=True, debug_eval=False,
+                 eval_backend='bitboard', use_null_move=True, use_lmr=True, use_futility=True,
+                 workers=1, persistent_tables=True, book_path=None,
+                 syzygy_path=None, collect_stats=False, use_pawn_structure=True):
+        # depth: độ sâu tối đa của iterative deepening
+        # time_limit (giây) / node_limit: ngân sách cứng cho mỗi nước, None = không giới hạn
         self.depth = depth
-        
-        self.mg_value = {
-            chess.PAWN: 82, chess.KNIGHT: 337, chess.BISHOP: 365,
-            chess.ROOK: 477, chess.QUEEN: 1025, chess.KING: 0
-        }
-        self.eg_value = {
-            chess.PAWN: 94, chess.KNIGHT: 281, chess.BISHOP: 297,
-            chess.ROOK: 512, chess.QUEEN: 936, chess.KING: 0
-        }
-
-        self.phase_weights = {
-            chess.KNIGHT: 1,
-            chess.BISHOP: 1,
-            chess.ROOK: 2,
-            chess.QUEEN: 4
-        }
-        self.total_phase = 24
-
-        ######### Bảng điểm trung cuộc ##################
-        # Tốt MG:
-        # - Khuyến khích chiếm/giữ trung tâm (d4, e4, d5, e5)
-        # - Hàng 2 (ban đầu) có bonus nhẹ để hỗ trợ phát triển
-        # - Các ô quá cao ở MG chưa cần đẩy mạnh nên không thưởng lớn
-        self.mg_pawn = [
-             0,  0,  0,  0,  0,  0,  0,  0,
-            50, 50, 50, 50, 50, 50, 50, 50,
-            10, 10, 20, 30, 30, 20, 10, 10,
-             5,  5, 10, 25, 25, 10,  5,  5,
-             0,  0,  0, 20, 20,  0,  0,  0,
-             5, -5,-10,  0,  0,-10, -5,  5,
-             5, 10, 10,-20,-20, 10, 10,  5,
-             0,  0,  0,  0,  0,  0,  0,  0
-        ]
-        
-        # Mã MG:
-        # - Bonus lớn ở trung tâm vì nhiều nước đi nhất và kiểm soát tốt ô quan trọng
-        # - Phạt ở biên/góc vì bị hạn chế tầm hoạt động
-        self.mg_knight = [
-            -50,-40,-30,-30,-30,-30,-40,-50,
-            -40,-20,  0,  0,  0,  0,-20,-40,
-            -30,  0, 10, 15, 15, 10,  0,-30,
-            -30,  5, 15, 20, 20, 15,  5,-30,
-            -30,  0, 15, 20, 20, 15,  0,-30,
-            -30,  5, 10, 15, 15, 10,  5,-30,
-            -40,-20,  0,  5,  5,  0,-20,-40,
-            -50,-40,-30,-30,-30,-30,-40,-50
-        ]
+        self.time_limit = time_limit
+        self.node_limit = node_limit
 
-        # Tượng MG:
-        # - Tránh góc/bị kẹt
-        # - Ưu tiên ô mở ra đường chéo dài, kiểm soát trung tâm từ xa
-        self.mg_bishop = [
-            -20,-10,-10,-10,-10,-10,-10,-20,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,  0,  5, 10, 10,  5,  0,-10,
-            -10,  5,  5, 10, 10,  5,  5,-10,
-            -10,  0, 10, 10, 10, 10,  0,-10,
-            -10, 10, 10, 10, 10, 10, 10,-10,
-            -10,  5,  0,  0,  0,  0,  5,-10,
-            -20,-10,-10,-10,-10,-10,-10,-20
-        ]
+        # workers > 1: chia các nước ở root cho nhiều process (xem agents/parallel_search.py).
+        # Mỗi worker dựng lại một MinimaxAgent đơn luồng với cùng cấu hình.
+        self.workers = max(1, int(workers))
+        self._worker_kwargs = dict(
+            depth=depth, use_tt=use_tt, tt_size_mb=tt_size_mb, move_orderer=move_orderer,
+            use_quiescence=use_quiescence, incremental_eval=incremental_eval, debug_eval=debug_eval,
+            eval_backend=eval_backend, use_null_move=use_null_move, use_lmr=use_lmr,
+            use_futility=use_futility, persistent_tables=persistent_tables,
+            syzygy_path=syzygy_path, use_pawn_structure=use_pawn_structure,
+        )
+        self._pool = None
+        # Cận alpha và cờ dừng (mp.Event) dùng chung giữa các worker (chỉ được gán bên trong
+        # worker process)
+        self.shared_alpha = None
+        self.shared_stop = None
 
-        # Xe MG:
-        # - PST ít ảnh hưởng hơn vì Xe phụ thuộc mạnh vào cấu trúc động:
-        #   cột mở, hàng 7, chiếm file.
-        # - Bảng chỉ thưởng nhẹ cho hàng 2 (tiếp cận hàng 7 địch)
-        self.mg_rook = [
-             0,  0,  0,  0,  0,  0,  0,  0,
-             5, 10, 10, 10, 10, 10, 10,  5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-             0,  0,  0,  5,  5,  0,  0,  0
-        ]
+        # Sách khai cuộc Polyglot (.bin), None = không dùng. Chỉ tra ở process chính,
+        # các worker song song không cần vì nước trong sách đã trả về trước khi chia việc.
+        self.book = OpeningBook(book_path) if book_path else None
 
-        # Hậu MG:
-        # - Phạt nhẹ việc ra quá sớm (hàng 1-2) vì dễ bị tempo đuổi
-        # - Thưởng nhẹ trung tâm khi đã phát triển
-        self.mg_queen = [
-            -20,-10,-10, -5, -5,-10,-10,-20,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,  0,  5,  5,  5,  5,  0,-10,
-             -5,  0,  5,  5,  5,  5,  0, -5,
-              0,  0,  5,  5,  5,  5,  0, -5,
-            -10,  5,  5,  5,  5,  5,  0,-10,
-            -10,  0,  5,  0,  0,  0,  0,-10,
-            -20,-10,-10, -5, -5,-10,-10,-20
-        ]
+        # Tablebase Syzygy cục bộ (thư mục chứa .rtbw/.rtbz), None = không dùng.
+        # Probe ở root (chọn nước theo DTZ) và trong search khi số quân đủ ít
+        self.tablebase = SyzygyTablebase(syzygy_path) if syzygy_path else None
 
-        # Vua MG:
-        # - Mục tiêu trung cuộc là an toàn: nhập thành, tránh trung tâm.
-        # - Vua ở trung tâm bị phạt rất nặng.
-        # - Hàng 1 góc (g1/c1) được thưởng do an toàn hơn.
-        self.mg_king = [
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -20,-30,-30,-40,-40,-30,-30,-20,
-            -10,-20,-20,-20,-20,-20,-20,-10,
-             20, 20,  0,  0,  0,  0, 20, 20,
-             20, 30, 10,  0,  0, 10, 30, 20
-        ]
+        # Bảng chuyển vị (Transposition Table) khoá bằng Zobrist hash
+        self.use_tt = use_tt
+        self.tt = TranspositionTable(tt_size_mb) if use_tt else None
 
-        self.eg_pawn = [
-             0,  0,  0,  0,  0,  0,  0,  0,
-            80, 80, 80, 80, 80, 80, 80, 80,
-            50, 50, 50, 50, 50, 50, 50, 50,
-            30, 30, 30, 30, 30, 30, 30, 30,
-            20, 20, 20, 20, 20, 20, 20, 20,
-            10, 10, 10, 10, 10, 10, 10, 10,
-            10, 10, 10, 10, 10, 10, 10, 10,
-             0,  0,  0,  0,  0,  0,  0,  0
-        ]
-        
-
-        ######### Bảng điểm tàn cuộc ##################
-        # Mã EG:
-        # - Thường không thay đổi nhiều so với MG (vẫn là quân tầm ngắn)
-        self.eg_knight = self.mg_knight
-        
-        # Tượng EG:
-        # - Dùng chung MG vì nguyên tắc đường chéo dài vẫn giữ.
-        self.eg_bishop = self.mg_bishop
-        
-        # Xe EG:
-        # - Cũng phụ thuộc mạnh vào file/hàng mở nên PST giữ gần MG.
-        self.eg_rook = self.mg_rook
-        
-        # Hậu EG:
-        # - Ít bị phạt ra sớm nữa.
-        # - Thưởng rõ hơn ở trung tâm để phản ánh vai trò “quân đa năng”.
-        self.eg_queen = [
-            -10,-10,-10,-10,-10,-10,-10,-10,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,  0,  5,  5,  5,  5,  0,-10,
-            -10,  0,  5, 10, 10,  5,  0,-10,
-            -10,  0,  5, 10, 10,  5,  0,-10,
-            -10,  0,  5,  5,  5,  5,  0,-10,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,-10,-10,-10,-10,-10,-10,-10
-        ]
-        
-        # Vua EG:
-        # - Nguyên tắc tàn cuộc: Vua phải chủ động, đi ra giữa.
-        # - Trung tâm có bonus lớn vì giúp:
-        #   + cản tốt đối phương
-        #   + hộ tống tốt phong cấp
-        #   + chiếm không gian
-        self.eg_king = [
-            -50,-40,-30,-20,-20,-30,-40,-50,
-            -30,-20,-10,  0,  0,-10,-20,-30,
-            -30,-10, 20, 30, 30, 20,-10,-30,
-            -30,-10, 30, 40, 40, 30,-10,-30,
-            -30,-10, 30, 40, 40, 30,-10,-30,
-            -30,-10, 20, 30, 30, 20,-10,-30,
-            -30,-30,  0,  0,  0,  0,-30,-30,
-            -50,-30,-30,-30,-30,-30,-30,-50
-        ]
-        
-        self.tables = {
-            'MG': {
-                chess.PAWN: self.mg_pawn,
-                chess.KNIGHT: self.mg_knight,
-                chess.BISHOP: self.mg_bishop,
-                chess.ROOK: self.mg_rook,
-                chess.QUEEN: self.mg_queen,
-                chess.KING: self.mg_king
-            },
-            'EG': {
-                chess.PAWN: self.eg_pawn,
-                chess.KNIGHT: self.eg_knight,
-                chess.BISHOP: self.eg_bishop,
-                chess.ROOK: self.eg_rook,
-                chess.QUEEN: self.eg_queen,
-                chess.KING: self.eg_king
-            }
-        }
-
-    def select_move(self, board):
+        # Giữ TT / killer / history giữa các lần select_move trong cùng một ván
+        # (entry cũ bị "già" đi theo generation thay vì xoá hết). new_game() để xoá.
+        self.persistent_tables = persistent_tables
+        self._last_root_ply = None
+
+        # Sắp xếp nước đi (TT move, MVV-LVA, killer, history); có thể truyền vào
+        # một object khác có cùng interface order()/record_cutoff()/clear()/age()
+        self.move_orderer = move_orderer if move_orderer is not None else MoveOrderer()
+
+        # Quiescence search ở node lá: chỉ xét nước ăn quân/phong cấp cho đến khi "yên tĩnh"
+        self.use_quiescence = use_quiescence
+
+        # Selective search, mỗi kỹ thuật bật/tắt riêng để đo số node tiết kiệm được
+        self.use_null_move = use_null_move
+        self.use_lmr = use_lmr
+        self.use_futility = use_futility
+
+        # Thống kê của lần select_move gần nhất
+        self.nodes = 0
+        self.qnodes = 0
+        self.leaf_evals = 0
+        self.search_time = 0.0
+        self.completed_depth = 0
+        # Biến chính (principal variation) và điểm của nó theo góc nhìn bên đi
+        self.pv = []
+        self.score = 0
+        # Các dòng của vòng iterative deepening hoàn tất gần nhất: (depth, điểm, PV);
+        # nhiều dòng khi search qua analyse(multipv > 1)
+        self.multipv_lines = []
+        # Kết quả từng vòng iterative deepening: (depth, nước tốt nhất, điểm, điểm có chính xác không)
+        self.iterations = []
+        self._root_exact = True
+        self._pv_table = [[] for _ in range(MAX_PLY + 1)]
+        # (depth, số node, thời gian) của từng vòng iterative deepening
+        self._iteration_log = []
+
+        # collect_stats=True: sau mỗi select_move, agent.last_stats là một SearchStats
+        # (NPS, cutoff, branching factor, TT/tablebase hit, thời gian từng vòng)
+        self.collect_stats = collect_stats
+        self.last_stats = None
+
+        # Trạng thái giới hạn của lần search hiện tại
+        self._search_start = 0.0
+        self._deadline = None
+        self._soft_deadline = None
+        self._max_nodes = None
+        self._limits_active = False
+        self._next_check = 0
+        # stop() (gọi từ thread khác) yêu cầu search đang chạy dừng lại
+        self._stop_event = threading.Event()
+
+        # Pondering: search sẵn trên thời gian của đối thủ (xem ponder())
+        self.ponder_move = None
+        self._pondering = False
+        self._ponder_hit = False
+        self._ponder_result = None
+
+        # Bảng đánh giá là hằng số của module, instance chỉ giữ tham chiếu
+        self.mg_value = MG_VALUE
+        self.eg_value = EG_VALUE
+        self.phase_weights = PHASE_WEIGHTS
+        self.total_phase = TOTAL_PHASE
+        self.tables = PST_TABLES
+
+        # eval_backend: cách tính lại toàn bộ điểm vật chất + PST
+        # - 'bitboard': duyệt bit của bitboard với bảng đã gộp giá trị quân và lật sẵn
+        # - 'scan'    : quét 64 ô như bản gốc (evaluate_material_full)
+        if eval_backend not in ('bitboard', 'scan'):
+            raise ValueError(f"eval_backend không hợp lệ: {eval_backend}")
+        self.eval_backend = eval_backend
+
+        # Đánh giá tăng dần: CompactBoard của search cập nhật (MG, EG, phase) theo từng nước
+        # push/pop. debug_eval=True: mỗi lần đánh giá đều so với kết quả tính lại toàn bàn cờ
+        self.incremental_eval = incremental_eval
+        self.debug_eval = debug_eval
+        self.evaluator = EVALUATOR
+        self._eval_active = False
+
+        # Cấu trúc Tốt (Tốt chồng / cô lập / thông) và lá chắn Tốt trước Vua, cache trong
+        # bảng băm theo pawn key nên gần như không tốn thêm thời gian ở mỗi node lá
+        self.pawn_table = PawnHashTable() if use_pawn_structure else None
+
+    def select_move(self, board, time_limit=None, node_limit=None, root_moves=None):
+        # root_moves: chỉ search trong tập nước này ở root (mặc định: mọi nước hợp lệ)
+        legal_moves = list(root_moves) if root_moves is not None else list(board.legal_moves)
+        if not legal_moves:
+            return None
+
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+
+        # Đối thủ đi đúng nước đã đoán: dùng luôn kết quả search lúc ponder
+        ponder_result = self._ponder_result
+        self._ponder_result = None
+        if ponder_result is not None and root_moves is None:
+            key, move = ponder_result
+            if key == board_key(board) and move in legal_moves:
+                self.search_time = 0.0
+                self._record_stats('ponder')
+                return move
+
+        # Thế cờ có trong sách khai cuộc: đi ngay, không search
+        if self.book is not None and root_moves is None:
+            move = self.book.pick(board)
+            if move is not None and move in legal_moves:
+                self.nodes = 0
+                self.qnodes = 0
+                self.completed_depth = 0
+                self.pv = [move]
+                self.iterations = []
+                self.search_time = 0.0
+                self._record_stats('book')
+                return move
+
+        # Thế cờ nằm trong tablebase: thắng/thua thì đi luôn nước tối ưu theo DTZ,
+        # hoà thì chỉ search trong các nước giữ hoà
+        if self.tablebase is not None and root_moves is None:
+            ranked = self.tablebase.root_moves(board, legal_moves)
+            if ranked is not None:
+                tb_wdl, legal_moves = ranked
+                if len(legal_moves) == 1:
+                    self.nodes = 0
+                    self.qnodes = 0
+                    self.completed_depth = 0
+                    self.pv = list(legal_moves)
+                    self.score = self._tb_score(tb_wdl, 0)
+                    self.iterations = []
+                    self.search_time = 0.0
+                    self._record_stats('tablebase')
+                    return legal_moves[0]
+
+        if self.workers > 1 and len(legal_moves) > 1:
+            return self._select_move_parallel(board, legal_moves, time_limit, node_limit)
+
+        self._stop_event.clear()
+        return self._search(board, legal_moves, time_limit, node_limit)
+
+    def analyse(self, board, multipv=1, depth=None, time_limit=None, node_limit=None):
+        # Phân tích thế cờ: tối đa `multipv` nước tốt nhất, mỗi nước kèm điểm (centipawn, góc
+        # nhìn bên đi) và biến chính, lấy từ MỘT lần search iterative deepening (không phải
+        # multipv lần search riêng). Giới hạn: depth và/hoặc time_limit / node_limit, mặc định
+        # như select_move. Không tra sách / tablebase ở root và luôn search đơn luồng.
+        # Trả về list dict {'multipv', 'move', 'score', 'pv', 'depth'} xếp theo điểm giảm dần
         legal_moves = list(board.legal_moves)
         if not legal_moves:
+            return []
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+
+        self._stop_event.clear()
+        self._search(board, legal_moves, time_limit, node_limit,
+                     max_depth=depth, multipv=max(1, min(multipv, len(legal_moves))))
+        return [
+            {'multipv': rank, 'move': pv[0], 'score': score, 'pv': pv, 'depth': line_depth}
+            for rank, (line_depth, score, pv) in enumerate(self.multipv_lines, 1)
+        ]
+
+    def _search(self, board, legal_moves, time_limit, node_limit, max_depth=None, multipv=1):
+        # multipv > 1: root giữ `multipv` nước tốt nhất với điểm chính xác (xem analyse)
+        self.nodes = 0
+        self.qnodes = 0
+        self.leaf_evals = 0
+        self._iteration_log = []
+        tb_counts = (self.tablebase.hits, self.tablebase.misses) if self.tablebase is not None else (0, 0)
+        pawn_counts = (self.pawn_table.hits, self.pawn_table.misses) if self.pawn_table is not None else (0, 0)
+        self.completed_depth = 0
+        self.pv = []
+        self.score = 0
+        self.iterations = []
+        start_time = time.time()
+        self._search_start = start_time
+        self._deadline = start_time + time_limit if time_limit else None
+        self._soft_deadline = start_time + time_limit / 2 if time_limit else None
+        self._max_nodes = node_limit
+        self._next_check = CHECK_INTERVAL
+        # Vòng depth 1 luôn được chạy trọn để luôn có nước đi trả về
+        # (trừ khi đang ponder: khi đó có thể bị huỷ bất cứ lúc nào)
+        self._limits_active = self._pondering
+
+        root_ply = len(board.move_stack)
+        self._prepare_tables(root_ply)
+        self.move_orderer.reset_stats()
+
+        # Chuyển sang CompactBoard một lần ở root: cả cây search dùng nước đi số nguyên
+        # và make/unmake của CompactBoard (kèm Zobrist key, điểm MG/EG tăng dần)
+        board = CompactBoard.from_board(board, self.evaluator if self.incremental_eval else None)
+        self._eval_active = self.incremental_eval
+        legal_moves = [encode_move(move) for move in legal_moves]
+        best_move = legal_moves[0]
+        lines = []
+        self.multipv_lines = []
+
+        try:
+            for depth in range(1, (max_depth or self.depth) + 1):
+                iteration_start = time.time()
+                iteration_nodes = self.nodes
+                # Iterative deepening: nước tốt nhất của vòng trước được thử đầu tiên,
+                # TT giữ nước tốt của các node con nên vòng sau cắt tỉa sớm hơn
+                legal_moves = self.move_orderer.order(board, legal_moves, 0, best_move)
+
+                if multipv > 1:
+                    # Các dòng của vòng trước được thử trước, theo đúng thứ hạng
+                    front = [move for _, move, _ in lines]
+                    legal_moves = front + [move for move in legal_moves if move not in front]
+                    lines = self._search_root_multipv(board, legal_moves, depth, multipv)
+                    best_value, best_move, self._pv_table[0] = lines[0]
+                    self._root_exact = True
+                else:
+                    best_move, best_value = self._search_aspiration(board, legal_moves, depth, best_move)
+                    lines = [(best_value, best_move, self._pv_table[0])]
+                self._iteration_log.append((depth, self.nodes - iteration_nodes, time.time() - iteration_start))
+                self.completed_depth = depth
+                self.score = best_value
+                self.pv = [decode_move(move) for move in self._pv_table[0]]
+                self.multipv_lines = [
+                    (depth, value, [decode_move(m) for m in pv] or [decode_move(move)])
+                    for value, move, pv in lines
+                ]
+                self.iterations.append((depth, decode_move(best_move), best_value, self._root_exact))
+                self._limits_active = True
+
+                # Đã tìm ra chiếu hết ở mọi dòng: search sâu hơn không đổi kết quả
+                if all(abs(value) >= MATE_SCORE for value, _, _ in lines):
+                    break
+
+                # Vòng sau thường tốn nhiều thời gian hơn tổng các vòng trước,
+                # nếu đã dùng quá nửa ngân sách thì dừng luôn
+                if self._soft_deadline is not None and time.time() > self._soft_deadline:
+                    break
+        except SearchAborted:
+            # Dùng kết quả của vòng hoàn tất gần nhất (board gốc không bị thay đổi)
+            pass
+
+        self._limits_active = False
+        self._eval_active = False
+        self.search_time = time.time() - start_time
+        self._record_stats('search', tb_counts, pawn_counts)
+        return decode_move(best_move)
+
+    def stop(self):
+        # Yêu cầu search đang chạy (ở thread khác) dừng sớm, kể cả các worker process
+        self._stop_event.set()
+        if self._pool is not None:
+            self._pool.stop()
+
+    def ponder(self, board):
+        # Search trên thời gian của đối thủ. `board` là thế cờ ngay sau nước agent vừa đi;
+        # giả định đối thủ sẽ đi nước thứ hai của PV và search sẵn thế cờ sau nước đó.
+        # Hàm chạy đồng bộ; GUI gọi prepare_ponder() ở thread giao diện rồi chạy
+        # search_ponder() trong thread riêng:
+        # - đối thủ đi đúng nước đoán: gọi ponderhit(), lần select_move sau dùng luôn kết quả
+        # - đoán sai: gọi stop(), kết quả bị bỏ nhưng TT/history vẫn "ấm"
+        return self.search_ponder(self.prepare_ponder(board))
+
+    def prepare_ponder(self, board):
+        # Phần đồng bộ của ponder(): đoán nước, đặt ponder_move và xoá cờ stop. Phải chạy
+        # xong trước khi thread search bắt đầu, để stop() / so sánh ponder_move gọi ngay sau
+        # đó không bị mất. Trả về thế cờ cần search (None = không ponder được)
+        self._ponder_result = None
+        self._ponder_hit = False
+        self.ponder_move = None
+
+        if len(self.pv) < 2 or not board.move_stack or board.peek() != self.pv[0]:
+            return None
+        predicted = self.pv[1]
+        if predicted not in board.legal_moves:
+            return None
+
+        ponder_board = board.copy()
+        ponder_board.push(predicted)
+        if not any(ponder_board.legal_moves):
             return None
 
+        self._stop_event.clear()
+        self.ponder_move = predicted
+        return ponder_board
+
+    def search_ponder(self, ponder_board):
+        # Search thế cờ của prepare_ponder(); bị huỷ bởi stop() kể cả khi stop() đến trước
+        if ponder_board is None:
+            return None
+        self._pondering = True
+        try:
+            # Chưa biết đối thủ đi gì nên chưa giới hạn thời gian (ponderhit() sẽ đặt lại),
+            # trừ khi ponderhit() đã đến trước khi search bắt đầu
+            time_limit = self.time_limit if self._ponder_hit else None
+            move = self._search(ponder_board, list(ponder_board.legal_moves), time_limit, self.node_limit)
+        finally:
+            self._pondering = False
+
+        if self._stop_event.is_set() and not self._ponder_hit:
+            return None
+        self._ponder_result = (board_key(ponder_board), move)
+        return move
+
+    def ponderhit(self):
+        # Đối thủ đi đúng nước đã đoán: search ponder đang chạy trở thành search thật.
+        # Thời gian đã ponder được tính vào ngân sách của nước này, nên nếu đối thủ
+        # nghĩ lâu hơn time_limit thì search dừng ngay và trả kết quả vòng gần nhất
+        self._ponder_hit = True
+        if self.time_limit:
+            self._deadline = self._search_start + self.time_limit
+            self._soft_deadline = self._search_start + self.time_limit / 2
+
+    def new_game(self):
+        # Xoá toàn bộ bảng search khi bắt đầu ván mới
+        if self.tt is not None:
+            self.tt.clear()
+        self.move_orderer.clear()
+        self._last_root_ply = None
+
+    def _prepare_tables(self, root_ply):
+        if not self.persistent_tables:
+            if self.tt is not None:
+                self.tt.clear()
+            self.move_orderer.clear()
+            return
+
+        # Số nước trong ván giảm đi nghĩa là đang ở một ván khác
+        if self._last_root_ply is None or root_ply < self._last_root_ply:
+            self.new_game()
+        else:
+            if self.tt is not None:
+                self.tt.new_search()
+            self.move_orderer.age(root_ply - self._last_root_ply)
+        self._last_root_ply = root_ply
+
+    def _search_aspiration(self, board, legal_moves, depth, prev_best):
+        # Aspiration window: search với cửa sổ hẹp quanh điểm của vòng trước,
+        # nếu điểm rơi ra ngoài cửa sổ thì nới rộng phía bị vượt và search lại
+        if depth == 1 or abs(self.score) >= MATE_SCORE or self.shared_alpha is not None:
+            return self._search_root(board, legal_moves, depth, -INF, INF)
+
+        delta = ASPIRATION_WINDOW
+        alpha = self.score - delta
+        beta = self.score + delta
+        while True:
+            move, score = self._search_root(board, legal_moves, depth, alpha, beta)
+            if score <= alpha:
+                # Fail-low: nước trả về không đáng tin, giữ nước tốt của vòng trước
+                alpha = -INF if delta > ASPIRATION_MAX else score - delta
+                move = prev_best
+            elif score >= beta:
+                beta = INF if delta > ASPIRATION_MAX else score + delta
+                prev_best = move
+            else:
+                return move, score
+            delta *= 2
+            legal_moves = self.move_orderer.order(board, legal_moves, 0, prev_best)
+
+    def _search_root(self, board, legal_moves, depth, alpha, beta):
+        # Root của negamax: điểm tính theo góc nhìn bên đang đi
         best_move = None
-        alpha = -math.inf
-        beta = math.inf
+        best_value = -INF
+        self._pv_table[0] = []
+        self._root_exact = False
+        shared = self.shared_alpha
 
-        is_white_turn = board.turn
-        best_value = -math.inf if is_white_turn else math.inf
+        for index, move in enumerate(legal_moves):
+            if shared is not None:
+                # Search song song: dùng cận tốt nhất mà các worker khác đã chứng minh
+                alpha = max(alpha, shared[depth])
 
-        for move in legal_moves:
             board.push(move)
-            value = self.minimax(board, self.depth - 1, alpha, beta)
+            if index == 0:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, 1)
+            else:
+                # PVS: chứng minh nước này không tốt hơn bằng cửa sổ rỗng,
+                # chỉ search lại với cửa sổ đầy đủ khi chứng minh thất bại
+                value = -self.negamax(board, depth - 1, -alpha - 1, -alpha, 1)
+                if alpha < value < beta:
+                    value = -self.negamax(board, depth - 1, -beta, -alpha, 1)
             board.pop()
 
-            if is_white_turn:
-                if value > best_value:
-                    best_value = value
-                    best_move = move
-                alpha = max(alpha, best_value)
+            if value > best_value:
+                best_value = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    self._root_exact = value < beta
+                    self._pv_table[0] = [move] + self._pv_table[1]
+                    if shared is not None:
+                        with shared.get_lock():
+                            if value > shared[depth]:
+                                shared[depth] = value
+                    if alpha >= beta:
+                        break
+
+        return best_move, best_value
+
+    def _search_root_multipv(self, board, legal_moves, depth, multipv):
+        # Root khi phân tích nhiều dòng: giữ `multipv` nước tốt nhất. Mỗi nước được chứng minh
+        # bằng cửa sổ rỗng tại điểm của dòng thứ `multipv` hiện tại; chỉ nước vượt qua mới được
+        # search lại với cửa sổ (cận đó, +INF) để có điểm chính xác và PV.
+        # Trả về list (điểm, nước, PV) xếp theo điểm giảm dần
+        lines = []
+        for move in legal_moves:
+            bound = lines[-1][0] if len(lines) == multipv else -INF
+
+            board.push(move)
+            if bound == -INF:
+                value = -self.negamax(board, depth - 1, -INF, INF, 1)
             else:
-                if value < best_value:
-                    best_value = value
-                    best_move = move
-                beta = min(beta, best_value)
+                value = -self.negamax(board, depth - 1, -bound - 1, -bound, 1)
+                if value > bound:
+                    value = -self.negamax(board, depth - 1, -INF, -bound, 1)
+            board.pop()
 
-        return best_move
+            if value > bound:
+                lines.append((value, move, [move] + self._pv_table[1]))
+                lines.sort(key=lambda line: line[0], reverse=True)
+                del lines[multipv:]
+        return lines
 
-    def minimax(self, board, depth, alpha, beta):
-        if depth == 0 or board.is_game_over():
-            return self.evaluate_board(board)
+    def _select_move_parallel(self, board, legal_moves, time_limit, node_limit):
+        start_time = time.time()
+        if self._pool is None:
+            self._pool = RootSplitPool(self.workers, self._worker_kwargs, self.depth)
 
-        is_maximizing = board.turn
-        legal_moves = list(board.legal_moves)
+        # Sắp xếp sơ bộ (ăn quân theo MVV-LVA trước) rồi chia xen kẽ để mỗi worker
+        # đều nhận được một phần các nước hứa hẹn
+        ordered = self.move_orderer.order(CompactBoard.from_board(board), [encode_move(m) for m in legal_moves], 0)
+        ordered = [decode_move(move) for move in ordered]
+        results = self._pool.search(board, ordered, time_limit, node_limit, -INF)
+
+        # Chỉ so sánh các worker ở cùng một depth: lấy depth lớn nhất mà mọi worker đều xong
+        common_depth = min(iters[-1][0] for iters, _ in results)
+        best = None
+        for iters, _ in results:
+            depth, move, value, exact = [it for it in iters if it[0] <= common_depth][-1]
+            # Cùng điểm thì ưu tiên điểm chính xác hơn điểm chỉ là cận trên (fail-low)
+            if best is None or (value, exact) > (best[2], best[3]):
+                best = (depth, move, value, exact)
+
+        self.nodes = sum(nodes for _, nodes in results)
+        self.completed_depth = common_depth
+        self.score = best[2]
+        self.pv = [best[1]]
+        self.iterations = [best]
+        self.search_time = time.time() - start_time
+        self._record_stats('parallel')
+        return best[1]
+
+    def _record_stats(self, source, tb_counts=None, pawn_counts=None):
+        if not self.collect_stats:
+            return
+        stats = SearchStats(source)
+        self.last_stats = stats
+        if source not in ('search', 'parallel'):
+            return
 
-        if is_maximizing:
-            max_eval = -math.inf
-            for move in legal_moves:
-                board.push(move)
-                eval_val = self.minimax(board, depth - 1, alpha, beta)
+        stats.time = self.search_time
+        stats.nodes = self.nodes
+        stats.completed_depth = self.completed_depth
+        if source == 'parallel':
+            # Các worker chạy ở process khác: chỉ có tổng số node
+            return
+
+        stats.qnodes = self.qnodes
+        stats.leaf_evals = self.leaf_evals
+        stats.beta_cutoffs = sum(self.move_orderer.cutoffs.values())
+        stats.first_move_cutoffs = sum(self.move_orderer.first_move_cutoffs.values())
+        if self.tt is not None:
+            stats.tt_hits = self.tt.hits
+            stats.tt_misses = self.tt.misses
+        if self.pawn_table is not None:
+            stats.pawn_hits = self.pawn_table.hits - pawn_counts[0]
+            stats.pawn_misses = self.pawn_table.misses - pawn_counts[1]
+        if self.tablebase is not None:
+            stats.tb_hits = self.tablebase.hits - tb_counts[0]
+            stats.tb_misses = self.tablebase.misses - tb_counts[1]
+        stats.iterations = list(self._iteration_log)
+
+    def close(self):
+        # Dừng các worker process của chế độ song song (nếu có) và đóng sách khai cuộc
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.book is not None:
+            self.book.close()
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+    def _check_limits(self):
+        self._next_check = self.nodes + CHECK_INTERVAL
+        if self._stop_event.is_set():
+            raise SearchAborted()
+        if self.shared_stop is not None and self.shared_stop.is_set():
+            raise SearchAborted()
+        if self._max_nodes is not None and self.nodes >= self._max_nodes:
+            raise SearchAborted()
+        if self._deadline is not None and time.time() >= self._deadline:
+            raise SearchAborted()
+
+    def negamax(self, board, depth, alpha, beta, ply=1, allow_null=True):
+        # Điểm trả về luôn theo góc nhìn bên đang đi (side-to-move relative)
+        self.nodes += 1
+        if self._limits_active and self.nodes >= self._next_check:
+            self._check_limits()
+
+        self._pv_table[ply] = []
+        is_pv_node = beta - alpha > 1
+
+        # Hoà theo luật (lặp lại / 50 nước) phụ thuộc đường đi nên được xét trước khi tra TT
+        if self._is_draw(board):
+            return 0
+
+        # Tra bảng chuyển vị: dùng lại kết quả nếu đã search vị trí này đủ sâu
+        # (kể cả lá depth 0, vì các lá hoán vị nhau chiếm phần lớn cây).
+        # Ở node PV không cắt bằng TT để giữ nguyên chuỗi PV.
+        key = None
+        tt_move = 0
+        alpha_orig = alpha
+        if self.tt is not None:
+            key = board.key
+            entry = self.tt.probe(key)
+            if entry is not None:
+                tt_depth, tt_flag, tt_score, tt_move = entry
+                if tt_depth >= depth and not is_pv_node:
+                    if tt_flag == EXACT:
+                        return tt_score
+                    if tt_flag == LOWER and tt_score >= beta:
+                        return tt_score
+                    if tt_flag == UPPER and tt_score <= alpha:
+                        return tt_score
+
+        # Đã vào phạm vi tablebase: điểm thắng/hoà/thua là chính xác, không cần search tiếp
+        if self.tablebase is not None and self.tablebase.can_probe(board):
+            wdl = self.tablebase.probe_wdl(board, board.key)
+            if wdl is not None:
+                score = self._tb_score(wdl, ply)
+                if key is not None:
+                    self.tt.store(key, MAX_PLY, EXACT, score, 0)
+                return score
+
+        if depth <= 0 and self.use_quiescence:
+            result = self.quiescence(board, alpha, beta, ply)
+            if key is not None:
+                self._store(key, 0, result, alpha_orig, beta, 0)
+            return result
+
+        if depth <= 0 or board.is_insufficient_material():
+            score = self._evaluate_side(board)
+            if key is not None:
+                self.tt.store(key, max(depth, 0), EXACT, score, 0)
+            return score
+
+        in_check = board.is_check()
+        static_eval = None
+        if not in_check and not is_pv_node and (self.use_null_move or self.use_futility):
+            static_eval = self._evaluate_side(board)
+
+        # Null-move pruning: cho đối phương đi thêm một nước mà vẫn >= beta thì node này
+        # gần như chắc chắn fail-high. Không dùng khi bên đi chỉ còn Vua + Tốt (dễ zugzwang)
+        if (self.use_null_move and allow_null and static_eval is not None
+                and depth >= NULL_MOVE_MIN_DEPTH and static_eval >= beta
+                and self._has_non_pawn_material(board)):
+            board.push_null()
+            value = -self.negamax(board, depth - 1 - NULL_MOVE_R, -beta, -beta + 1, ply + 1, False)
+            board.pop()
+            if value >= beta:
+                # Không trả về điểm chiếu hết chưa được kiểm chứng
+                return beta if value >= MATE_SCORE else value
+
+        # Futility pruning: gần lá, điểm tĩnh cộng biên vẫn không tới alpha thì
+        # các nước yên tĩnh (không chiếu) không thể cứu được node
+        futility_value = None
+        if (self.use_futility and static_eval is not None and depth < len(FUTILITY_MARGINS)
+                and abs(alpha) < MATE_SCORE):
+            if static_eval + FUTILITY_MARGINS[depth] <= alpha:
+                futility_value = static_eval + FUTILITY_MARGINS[depth]
+
+        # Sinh nước theo giai đoạn: nước trong TT, nước ăn quân, killer, nước yên tĩnh theo
+        # history. Tính hợp lệ chỉ được kiểm tra khi đi thử, nên node cắt tỉa sớm không phải
+        # sinh / kiểm tra phần còn lại
+        best_move = 0
+        best_value = -INF
+        index = -1
+
+        for move in self.move_orderer.staged(board, ply, tt_move):
+            is_quiet = not (move >> 12 or board.is_capture(move))
+            board.push(move)
+            if not board.was_legal():
                 board.pop()
+                continue
+            index += 1
 
-                max_eval = max(max_eval, eval_val)
-                alpha = max(alpha, eval_val)
+            # Futility pruning / LMR cần biết nước có chiếu không: thế cờ đã đi sẵn nên chỉ
+            # cần xem bên vừa đến lượt có bị chiếu không
+            gives_check = None
+            if futility_value is not None and index > 0 and is_quiet:
+                gives_check = board.is_check()
+                if not gives_check:
+                    board.pop()
+                    best_value = max(best_value, futility_value)
+                    continue
 
-                if beta <= alpha:
-                    break
+            # Late move reductions: nước yên tĩnh xếp muộn thường tệ, search nông hơn trước
+            reduction = 0
+            if (self.use_lmr and is_quiet and not in_check and depth >= LMR_MIN_DEPTH
+                    and index >= LMR_MIN_INDEX):
+                if gives_check is None:
+                    gives_check = board.is_check()
+                if not gives_check:
+                    reduction = 2 if (index >= 2 * LMR_MIN_INDEX and depth >= 5) else 1
 
-            return max_eval
+            if index == 0:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                value = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                if reduction and value > alpha:
+                    # Nước bị giảm lại vượt alpha: search lại ở độ sâu đầy đủ
+                    value = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < value < beta:
+                    value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    self._pv_table[ply] = [move] + self._pv_table[ply + 1]
+                    if alpha >= beta:
+                        self.move_orderer.record_cutoff(board, move, ply, depth, index, tt_move)
+                        break
+
+        if index < 0:
+            # Không có nước hợp lệ nào: chiếu hết hoặc hết nước đi
+            best_value = self._evaluate_side(board)
+            if key is not None:
+                self.tt.store(key, depth, EXACT, best_value, 0)
+            return best_value
+
+        if key is not None:
+            self._store(key, depth, best_value, alpha_orig, beta, best_move)
+
+        return best_value
 
+    def _is_draw(self, board):
+        # Lặp lại thế cờ (lần thứ 2 đã tính hoà, kể cả lặp lại thế cờ của ván trước root) hoặc
+        # luật 50 nước, tra trong lịch sử Zobrist key của CompactBoard: O(halfmove_clock)
+        if board.halfmove_clock >= 100:
+            return not board.is_checkmate()
+        return board.is_repetition(2)
+
+    def _tb_score(self, wdl, ply):
+        # Thắng/thua bị luật 50 nước biến thành hoà (wdl = ±1) được tính như hoà
+        if wdl == 2:
+            return TB_WIN_SCORE - ply
+        if wdl == -2:
+            return -TB_WIN_SCORE + ply
+        return 0
+
+    def _has_non_pawn_material(self, board):
+        us = board.occupied_co[board.turn]
+        return bool((board.knights | board.bishops | board.rooks | board.queens) & us)
+
+    def _store(self, key, depth, result, alpha_orig, beta, best_move):
+        if result <= alpha_orig:
+            # Fail-low: không nước nào vượt alpha nên "nước tốt nhất" không có ý nghĩa
+            flag = UPPER
+            best_move = None
+        elif result >= beta:
+            flag = LOWER
         else:
-            min_eval = math.inf
-            for move in legal_moves:
-                board.push(move)
-                eval_val = self.minimax(board, depth - 1, alpha, beta)
+            flag = EXACT
+        self.tt.store(key, depth, flag, result, best_move)
+
+    def quiescence(self, board, alpha, beta, ply):
+        # Tiếp tục search các nước ăn quân/phong cấp ở node lá để tránh horizon effect
+        # (dừng đánh giá giữa một chuỗi đổi quân)
+        self.nodes += 1
+        self.qnodes += 1
+        if self._limits_active and self.nodes >= self._next_check:
+            self._check_limits()
+
+        if board.is_check():
+            # Đang bị chiếu: không được "đứng yên", phải xét mọi nước thoát chiếu
+            moves = board.legal_moves()
+            if not moves:
+                return -MATE_SCORE
+            stand_pat = None
+            best = -INF
+        else:
+            # Stand-pat: bên đi có thể không ăn quân, nên điểm tĩnh là cận dưới của node
+            stand_pat = self._evaluate_side(board)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best = stand_pat
+
+            # Nước ăn quân và phong cấp (pseudo-legal, kiểm tra hợp lệ khi đi thử)
+            moves = board.generate_moves(quiets=False)
+
+        for move in self.move_orderer.order(board, moves, ply):
+            # Delta pruning: kể cả ăn được quân này (cộng biên an toàn)
+            # cũng không kéo được điểm lên quá alpha thì bỏ qua
+            if stand_pat is not None and stand_pat + self._capture_gain(board, move) + DELTA_MARGIN <= alpha:
+                continue
+
+            board.push(move)
+            if not board.was_legal():
                 board.pop()
+                continue
+            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
 
-                min_eval = min(min_eval, eval_val)
-                beta = min(beta, eval_val)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
 
-                if beta <= alpha:
-                    break
+        return best
+
+    def _capture_gain(self, board, move):
+        gain = 0
+        if board.is_capture(move):
+            victim = board.pieces[(move >> 6) & 63] or chess.PAWN
+            gain += max(self.mg_value[victim], self.eg_value[victim])
+        promotion = move >> 12
+        if promotion:
+            gain += max(self.mg_value[promotion], self.eg_value[promotion]) - self.mg_value[chess.PAWN]
+        return gain
 
-            return min_eval
+    def _evaluate_side(self, board):
+        self.leaf_evals += 1
+        score = self.evaluate_board(board)
+        return score if board.turn == chess.WHITE else -score
 
     def evaluate_board(self, board):
+        # board: chess.Board hoặc CompactBoard của search (cùng tên thuộc tính bitboard)
         if board.is_checkmate():
-            return 99999 if board.outcome().winner == chess.WHITE else -99999
+            return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
 
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
 
+        if self._eval_active:
+            mg_score, eg_score, current_phase = board.mg, board.eg, board.phase
+            if self.debug_eval:
+                full = self.evaluate_material_full(board)
+                if full != (mg_score, eg_score, current_phase):
+                    raise AssertionError(
+                        f"Incremental eval lệch: {(mg_score, eg_score, current_phase)} != {full} tại {board.fen()}"
+                    )
+                if board.pawn_key != pawn_key(board):
+                    raise AssertionError(f"Pawn key lệch tại {board.fen()}")
+            key = board.pawn_key
+        elif self.eval_backend == 'bitboard':
+            mg_score, eg_score, current_phase = self.evaluator.compute(board)
+            key = None
+        else:
+            mg_score, eg_score, current_phase = self.evaluate_material_full(board)
+            key = None
+
+        if self.pawn_table is not None:
+            pawn_mg, pawn_eg = self.pawn_table.evaluate(board, pawn_key(board) if key is None else key)
+            mg_score += pawn_mg
+            eg_score += pawn_eg
+
+        current_phase = min(current_phase, self.total_phase)
+
+        mg_weight = current_phase
+        eg_weight = self.total_phase - current_phase
+
+        final_score = (mg_score * mg_weight + eg_score * eg_weight) / self.total_phase
+
+        return int(final_score)
+
+    def evaluate_material_full(self, board):
+        # Quét toàn bộ 64 ô, trả về (điểm MG, điểm EG, phase) theo góc nhìn phe Trắng
         mg_score = 0
         eg_score = 0
         current_phase = 0
@@ -292,11 +1085,4 @@ class MinimaxAgent:
                 mg_score -= (mg_val + mg_pst)
                 eg_score -= (eg_val + eg_pst)
 
-        current_phase = min(current_phase, self.total_phase)
-
-        mg_weight = current_phase
-        eg_weight = self.total_phase - current_phase
-
-        final_score = (mg_score * mg_weight + eg_score * eg_weight) / self.total_phase
-
-        return int(final_score)
+        return mg_score, eg_score, current_phase
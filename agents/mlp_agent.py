@@ -6,80 +6,148 @@ import os
 import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import board_to_tensor
+from utils import board_bitboards, bitboards_to_array
+from agents.opening_book import OpeningBook
+from agents.compact_board import CompactBoard
+from agents.transposition_table import encode_move
 
-from training.model_mlp import ChessMLP_Scratch, xp 
+from training.model_mlp import ChessMLP_Scratch, QuantizedMLP, quantize_weights, quantized_path, xp
+
+# Điểm của nước chiếu hết trong analyse (ngoài khoảng [-1, 1] của Tanh)
+WIN_SCORE = 2.0
+# Số nước hợp lệ tối đa của một thế cờ là 218: buffer input đủ cho mọi thế cờ
+MAX_MOVES = 256
 
 
 class MLPAgent:
-    def __init__(self, model_path='training/best_model_mlp.npz'):
+    def __init__(self, model_path='training/best_model_mlp.npz', book_path=None, quantized=False):
 
         self.device_name = "GPU (CuPy)" if xp.__name__ == 'cupy' else "CPU (NumPy)"
         print(f"[MLPAgent] Init using backend: {self.device_name}")
         
-        self.model = ChessMLP_Scratch()
-        
+        # Chế độ chỉ suy luận (buffer có sẵn) dùng để chấm điểm khi chơi: float32, hoặc
+        # weights int8 cộng dồn số nguyên nếu quantized=True (chỉ CPU). Engine dựng lại từ
+        # model hiện tại khi cần (xem thuộc tính engine)
+        self.quantized = quantized
+        self.load_weights(model_path)
+
+        # Sách khai cuộc Polyglot (.bin), None = không dùng
+        self.book = OpeningBook(book_path) if book_path else None
+
+        # Buffer input dùng lại cho mọi lần chấm điểm (mỗi dòng một thế cờ sau nước đi)
+        self._input_buffer = np.zeros((MAX_MOVES, 13, 8, 8), dtype=np.float32)
+
+    @property
+    def model(self):
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Gán model mới (đã load sẵn weights): engine cũ bị bỏ, dựng lại ở lần chấm điểm sau
+        self._model = model
+        self._model_path = None
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None and self._model is not None:
+            self._engine = self._quantized_engine() if self.quantized else self._model.inference_engine(MAX_MOVES)
+        return self._engine
+
+    def load_weights(self, model_path):
+        # Load (lại) weights từ file .npz; model = None nếu không load được
+        model = ChessMLP_Scratch()
         try:
             if os.path.exists(model_path):
-                self.model.load_weights(model_path)
+                model.load_weights(model_path)
                 print(f"[MLPAgent] Đã load weights thành công từ {model_path}")
             else:
                 print(f"[MLPAgent] CẢNH BÁO: Không tìm thấy file {model_path}")
-                self.model = None
+                model = None
         except Exception as e:
             print(f"[MLPAgent] LỖI load model: {e}")
-            self.model = None
+            model = None
+        self.model = model
+        self._model_path = model_path if model is not None else None
+
+    def _quantized_engine(self):
+        # Dùng checkpoint int8 của training/quantize_mlp.py nếu có và không cũ hơn checkpoint
+        # float đã load, ngược lại lượng tử hoá ngay từ weights của model
+        path = quantized_path(self._model_path) if self._model_path else None
+        if path and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self._model_path):
+            print(f"[MLPAgent] Dùng weights int8 từ {path}")
+            return QuantizedMLP.load(path, MAX_MOVES)
+        print("[MLPAgent] Lượng tử hoá int8 từ weights float của model")
+        return QuantizedMLP(quantize_weights(self._model), MAX_MOVES)
 
     def select_move(self, board):
         legal_moves = list(board.legal_moves)
         if not legal_moves:
             return None
 
-        for move in legal_moves:
-            board.push(move)
-            if board.is_checkmate():
-                board.pop()
+        if self.book is not None:
+            move = self.book.pick(board)
+            if move is not None and move in legal_moves:
                 return move
-            board.pop()
 
-        if self.model is None:
+        # Nước chiếu hết được WIN_SCORE nên luôn được chọn (nước đầu tiên nếu có nhiều)
+        scores = self._score_moves(board, legal_moves)
+        if self.model is None and scores.max() < WIN_SCORE:
             return random.choice(legal_moves)
+        return legal_moves[scores.argmax()]
 
-        potential_boards = []  # danh sách tensor tương ứng các trạng thái sau nước đi
-        move_list = []         # danh sách nước đi hợp lệ
-
-        for move in legal_moves:
-            board.push(move)
-
-            tensor = board_to_tensor(board).numpy()
-            potential_boards.append(tensor)
-            move_list.append(move)
-
-            board.pop()
-
-        batch_input = xp.asarray(np.array(potential_boards))
-
-        output = self.model.forward(batch_input)
+    def analyse(self, board, multipv=1):
+        # Phiên bản có điểm của select_move (1 ply, không tra sách): tối đa `multipv` nước
+        # tốt nhất theo điểm MLP, cùng dạng kết quả với MinimaxAgent.analyse. Điểm là đầu ra
+        # Tanh theo góc nhìn bên đi (đã trừ phạt hoà), nước chiếu hết được WIN_SCORE
+        legal_moves = list(board.legal_moves)
+        if not legal_moves or self.model is None:
+            return []
+
+        scores = self._score_moves(board, legal_moves)
+        ranked = sorted(range(len(legal_moves)), key=lambda i: scores[i], reverse=True)
+        return [
+            {'multipv': rank, 'move': legal_moves[i], 'score': float(scores[i]),
+             'pv': [legal_moves[i]], 'depth': 1}
+            for rank, i in enumerate(ranked[:max(1, multipv)], 1)
+        ]
+
+    def _score_moves(self, board, legal_moves):
+        # Điểm của thế cờ sau mỗi nước, theo góc nhìn bên đang đi (cả batch một lần forward).
+        # Đi thử trên CompactBoard: lấy 12 bitboard để mã hoá theo batch (utils.bitboards_to_array),
+        # và kiểm tra chiếu hết / hoà (CompactBoard.can_claim_draw: cùng kết quả với
+        # chess.Board.can_claim_draw nhưng tra lịch sử Zobrist key thay vì đi lại cả ván).
+        # Không có model thì mọi nước được 0 điểm, chỉ còn điểm chiếu hết / hoà
+        compact = CompactBoard.from_board(board)
+        bitboards = []
+        turns = []
+        mates = []
+        draws = []
+        for i, move in enumerate(legal_moves):
+            compact.push(encode_move(move))
+            planes, turn = board_bitboards(compact)
+            bitboards.append(planes)
+            turns.append(turn)
+            if compact.is_checkmate():
+                mates.append(i)
+            elif compact.is_stalemate() or compact.can_claim_draw():
+                draws.append(i)
+            compact.pop()
 
-        if xp.__name__ == 'cupy':
-            scores = xp.asnumpy(output).flatten()
+        if self.model is None:
+            scores = np.zeros(len(legal_moves))
         else:
-            scores = output.flatten()
+            batch_input = bitboards_to_array(bitboards, turns, self._input_buffer)
+            output = self.engine.forward(xp.asarray(batch_input))
 
-        if board.turn == chess.WHITE:
-            for i, move in enumerate(move_list):
-                board.push(move)
-                if board.is_stalemate() or board.can_claim_draw():
-                    scores[i] -= 0.5
-                board.pop()
-            best_idx = scores.argmax()
-
-        else:
-            for i, move in enumerate(move_list):
-                board.push(move)
-                if board.is_stalemate() or board.can_claim_draw():
-                    scores[i] += 0.5
-                board.pop()
-            best_idx = scores.argmin()
-
-        return move_list[best_idx]
\ No newline at end of file
+            if xp.__name__ == 'cupy':
+                scores = xp.asnumpy(output).flatten()
+            else:
+                scores = output.flatten()
+
+            # Model chấm theo góc nhìn quân Trắng
+            if board.turn == chess.BLACK:
+                scores = -scores
+        scores[draws] -= 0.5
+        scores[mates] = WIN_SCORE
+        return scores
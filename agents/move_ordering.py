@@ -0,0 +1,164 @@
+# agents/move_ordering.py
+import chess
+
+# Nước đi là số nguyên from | to << 6 | promotion << 12 (encode_move), board là CompactBoard
+# của search (agents/compact_board.py)
+
+# Giá trị quân dùng cho MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
+MVV_LVA_VALUE = {
+    chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3,
+    chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 20
+}
+
+# Nhóm nước đi, theo đúng thứ tự được thử
+TT_MOVE = 'tt'
+CAPTURE = 'capture'
+KILLER = 'killer'
+QUIET = 'quiet'
+CATEGORIES = (TT_MOVE, CAPTURE, KILLER, QUIET)
+
+# Mỗi nhóm nằm trong một dải điểm riêng để sort một lần là đúng thứ tự nhóm
+TT_SCORE = 1000000
+CAPTURE_SCORE = 100000
+KILLER_SCORE = 90000
+HISTORY_MAX = 80000
+
+MAX_PLY = 128
+
+
+class MoveOrderer:
+    def __init__(self, use_mvv_lva=True, use_killers=True, use_history=True):
+        self.use_mvv_lva = use_mvv_lva
+        self.use_killers = use_killers
+        self.use_history = use_history
+
+        # killers[ply] = 2 nước yên tĩnh gần nhất gây cắt tỉa ở ply đó (0 = chưa có)
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        # history[color * 4096 + (move & 4095)]: thưởng theo depth^2 mỗi lần gây cắt tỉa
+        self.history = [0] * (2 * 64 * 64)
+
+        self.reset_stats()
+
+    def clear(self):
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+
+    def age(self, plies):
+        # Giữ bảng giữa các lần search trong cùng ván: ply tính từ root nên killer
+        # của lần trước ở ply p ứng với ply p - plies bây giờ; history giảm một nửa
+        # để thông tin mới có trọng số lớn hơn
+        if 0 < plies < MAX_PLY:
+            self.killers = self.killers[plies:] + [[0, 0] for _ in range(plies)]
+        elif plies != 0:
+            self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [h // 2 for h in self.history]
+
+    def reset_stats(self):
+        # cutoffs[c]: số lần nước thuộc nhóm c gây beta-cutoff
+        # first_move_cutoffs[c]: trong đó, số lần nó là nước ĐẦU TIÊN được thử
+        self.cutoffs = {c: 0 for c in CATEGORIES}
+        self.first_move_cutoffs = {c: 0 for c in CATEGORIES}
+
+    def category(self, board, move, ply, tt_move=0):
+        if move == tt_move:
+            return TT_MOVE
+        if move >> 12 or board.is_capture(move):
+            return CAPTURE
+        if ply < MAX_PLY and move in self.killers[ply]:
+            return KILLER
+        return QUIET
+
+    def score(self, board, move, ply, tt_move=0):
+        if move == tt_move:
+            return TT_SCORE
+
+        promotion = move >> 12
+        is_capture = board.is_capture(move)
+        if promotion or is_capture:
+            if not self.use_mvv_lva:
+                return CAPTURE_SCORE
+            value = CAPTURE_SCORE - MVV_LVA_VALUE[board.pieces[move & 63]]
+            if is_capture:
+                # Bắt tốt qua đường: ô đích trống nhưng nạn nhân là tốt
+                victim = board.pieces[(move >> 6) & 63] or chess.PAWN
+                value += 10 * MVV_LVA_VALUE[victim]
+            if promotion:
+                value += 10 * MVV_LVA_VALUE[promotion]
+            return value
+
+        if self.use_killers and ply < MAX_PLY:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+
+        if self.use_history:
+            return self.history[board.turn * 4096 + (move & 4095)]
+        return 0
+
+    def order(self, board, moves, ply, tt_move=0):
+        return sorted(moves, key=lambda m: self.score(board, m, ply, tt_move), reverse=True)
+
+    def staged(self, board, ply, tt_move=0):
+        # Sinh nước theo từng giai đoạn, mỗi giai đoạn chỉ được sinh khi các nước trước
+        # đã thử hết mà chưa cắt tỉa: TT move -> ăn quân/phong cấp (MVV-LVA) -> killer
+        # -> nước yên tĩnh theo history. Nước trả về là pseudo-legal, search tự kiểm tra
+        # hợp lệ khi đi thử (board.push + board.was_legal)
+        if tt_move and board.is_pseudo_legal(tt_move):
+            yield tt_move
+
+        captures = board.generate_moves(quiets=False)
+        if len(captures) > 1:
+            captures.sort(key=lambda m: self.score(board, m, ply), reverse=True)
+        for move in captures:
+            if move != tt_move:
+                yield move
+
+        killers = ()
+        if self.use_killers and ply < MAX_PLY:
+            killers = self.killers[ply]
+            for killer in killers:
+                # Killer của thế cờ anh em có thể là nước ăn quân ở đây (đã thử ở trên)
+                if (killer and killer != tt_move and not killer >> 12
+                        and board.is_pseudo_legal(killer) and not board.is_capture(killer)):
+                    yield killer
+
+        quiets = board.generate_moves(captures=False)
+        if self.use_history and len(quiets) > 1:
+            history = self.history
+            offset = board.turn * 4096
+            quiets.sort(key=lambda m: history[offset + (m & 4095)], reverse=True)
+        for move in quiets:
+            if move != tt_move and move not in killers:
+                yield move
+
+    def record_cutoff(self, board, move, ply, depth, index, tt_move=0):
+        # Gọi khi `move` (nước thứ `index` được thử ở node) gây beta-cutoff,
+        # board đang ở vị trí của node (đã pop nước đi)
+        cat = self.category(board, move, ply, tt_move)
+        self.cutoffs[cat] += 1
+        if index == 0:
+            self.first_move_cutoffs[cat] += 1
+
+        if move >> 12 or board.is_capture(move):
+            return
+
+        if self.use_killers and ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        if self.use_history:
+            idx = board.turn * 4096 + (move & 4095)
+            self.history[idx] += depth * depth
+            if self.history[idx] >= HISTORY_MAX:
+                # Giảm một nửa toàn bảng để giữ tỉ lệ và không lấn sang dải killer
+                self.history = [h // 2 for h in self.history]
+
+    def first_move_cutoff_rate(self):
+        total = sum(self.cutoffs.values())
+        if total == 0:
+            return 0.0
+        return sum(self.first_move_cutoffs.values()) / total
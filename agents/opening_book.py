@@ -0,0 +1,45 @@
+# agents/opening_book.py
+import os
+import random
+
+import chess
+import chess.polyglot
+
+
+class OpeningBook:
+    # Sách khai cuộc định dạng Polyglot (.bin): các entry 16 byte sắp theo Zobrist key.
+    # chess.polyglot.MemoryMappedReader map file vào bộ nhớ và tìm nhị phân theo key,
+    # nên mỗi lần tra chỉ đọc vài chục byte, không nạp cả file.
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.reader = None
+        self.rng = random.Random(seed)
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(path):
+            print(f"[OpeningBook] CẢNH BÁO: Không tìm thấy file sách khai cuộc {path}")
+            return
+        try:
+            self.reader = chess.polyglot.open_reader(path)
+        except Exception as e:
+            print(f"[OpeningBook] LỖI mở sách khai cuộc {path}: {e}")
+            self.reader = None
+
+    def pick(self, board):
+        # Chọn ngẫu nhiên một nước trong sách theo trọng số, None nếu thế cờ không có trong sách
+        if self.reader is None:
+            return None
+        try:
+            entry = self.reader.weighted_choice(board, random=self.rng)
+        except IndexError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.move
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
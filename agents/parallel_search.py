@@ -0,0 +1,70 @@
+# agents/parallel_search.py
+import multiprocessing as mp
+
+# Search song song kiểu chia nước ở root (root splitting):
+# - danh sách nước đi ở root được chia đều (xen kẽ theo thứ tự đã sắp xếp) cho N process
+# - mỗi process chạy iterative deepening của riêng nó trên phần nước được giao
+# - các process chia sẻ cận alpha ở root cho từng depth qua shared memory, nên một
+#   process tìm được nước tốt sẽ giúp các process khác cắt tỉa sớm hơn ngay lập tức
+# - stop() của agent chính đặt một mp.Event dùng chung, mọi worker kiểm tra nó cùng lúc
+#   với giới hạn thời gian / số node nên dừng ngay ở lần kiểm tra kế tiếp
+# Chia ở root mất phần cắt tỉa mà search đơn luồng có được nhờ nước tốt nhất tìm trước
+# (mỗi worker có TT / history riêng, nước của worker khác chỉ đến qua cận alpha), nên tổng
+# số node tăng lên: chỉ nhanh hơn khi số core thật đủ bù phần node thừa. Xem README và
+# benchmark_smp.py trước khi bật
+
+# Trạng thái riêng của mỗi worker process (khởi tạo một lần trong initializer)
+_WORKER_AGENT = None
+
+
+def _init_worker(agent_kwargs, shared_alpha, shared_stop):
+    global _WORKER_AGENT
+    from agents.minimax_agent import MinimaxAgent
+
+    _WORKER_AGENT = MinimaxAgent(**agent_kwargs)
+    _WORKER_AGENT.shared_alpha = shared_alpha
+    _WORKER_AGENT.shared_stop = shared_stop
+
+
+def _worker_search(board, root_moves, time_limit, node_limit):
+    agent = _WORKER_AGENT
+    agent.select_move(board, time_limit=time_limit, node_limit=node_limit, root_moves=root_moves)
+    return agent.iterations, agent.nodes
+
+
+class RootSplitPool:
+    def __init__(self, workers, agent_kwargs, max_depth):
+        self.workers = workers
+        # shared_alpha[d]: điểm tốt nhất (góc nhìn bên đi ở root) đã chứng minh ở depth d
+        self.shared_alpha = mp.Array('i', max_depth + 2)
+        # Đặt bởi stop(): mọi worker dừng search đang chạy
+        self.shared_stop = mp.Event()
+        self.pool = mp.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(agent_kwargs, self.shared_alpha, self.shared_stop),
+        )
+
+    def search(self, board, ordered_moves, time_limit, node_limit, neg_inf):
+        with self.shared_alpha.get_lock():
+            for i in range(len(self.shared_alpha)):
+                self.shared_alpha[i] = neg_inf
+        self.shared_stop.clear()
+
+        chunks = [ordered_moves[i::self.workers] for i in range(self.workers)]
+        chunks = [c for c in chunks if c]
+        if node_limit is not None:
+            node_limit = max(1, node_limit // len(chunks))
+
+        pending = [
+            self.pool.apply_async(_worker_search, (board.copy(), chunk, time_limit, node_limit))
+            for chunk in chunks
+        ]
+        return [p.get() for p in pending]
+
+    def stop(self):
+        self.shared_stop.set()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
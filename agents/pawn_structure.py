@@ -0,0 +1,157 @@
+# agents/pawn_structure.py
+import chess
+
+from agents.transposition_table import piece_key
+
+# Điểm cấu trúc Tốt (centipawn, theo cặp trung cuộc / tàn cuộc)
+DOUBLED_PENALTY = (10, 25)      # mỗi Tốt thừa trên cùng một cột
+ISOLATED_PENALTY = (8, 15)      # không có Tốt phe mình ở hai cột bên cạnh
+# Tốt thông theo hàng tương đối (0 = hàng xuất phát của quân lớn, 7 = hàng phong cấp)
+PASSED_BONUS_MG = (0, 5, 10, 15, 25, 45, 70, 0)
+PASSED_BONUS_EG = (0, 10, 15, 25, 45, 75, 110, 0)
+
+# Lá chắn Tốt trước Vua (chỉ tính ở trung cuộc), cho mỗi cột trong 3 cột quanh Vua:
+# phạt theo khoảng cách đến Tốt gần nhất phía trước Vua, cột không có Tốt phạt nặng nhất
+SHELTER_PENALTY = (0, 0, 10, 20, 20, 20, 20, 20)
+SHELTER_MISSING = 30
+SHELTER_OPEN_FILE = 10          # cột không còn Tốt của cả hai bên
+
+# Số entry của bảng băm Tốt (luỹ thừa 2)
+PAWN_TABLE_SIZE = 1 << 14
+
+_ADJACENT_FILES = [
+    (chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+    for f in range(8)
+]
+
+
+def _front_span(color, square):
+    # Các ô phía trước `square` (theo hướng đi của `color`) trên cùng cột
+    rank = chess.square_rank(square)
+    if color == chess.WHITE:
+        ranks = range(rank + 1, 8)
+    else:
+        ranks = range(rank - 1, -1, -1)
+    bb = 0
+    for r in ranks:
+        bb |= chess.BB_RANKS[r]
+    return bb & chess.BB_FILES[chess.square_file(square)]
+
+
+# FRONT_SPAN[color][sq]: các ô phía trước sq trên cùng cột.
+# PASSED_MASK[color][sq]: thêm cả hai cột bên cạnh. Tốt ở sq là Tốt thông nếu không có
+# Tốt đối phương nào trong vùng này
+FRONT_SPAN = [[_front_span(color, sq) for sq in chess.SQUARES] for color in (chess.BLACK, chess.WHITE)]
+PASSED_MASK = [[0] * 64, [0] * 64]
+for _color in chess.COLORS:
+    for _sq in chess.SQUARES:
+        _span = FRONT_SPAN[_color][_sq]
+        _adjacent = _ADJACENT_FILES[chess.square_file(_sq)]
+        _mask = _span
+        for _s in chess.scan_forward(_span):
+            _mask |= chess.BB_RANKS[chess.square_rank(_s)] & _adjacent
+        PASSED_MASK[_color][_sq] = _mask
+
+
+def pawn_key(board):
+    # Zobrist key chỉ gồm Tốt của hai bên (cùng bảng số ngẫu nhiên với chess.polyglot)
+    key = 0
+    for color in chess.COLORS:
+        for sq in chess.scan_forward(board.pawns & board.occupied_co[color]):
+            key ^= piece_key(chess.PAWN, color, sq)
+    return key
+
+
+class PawnHashTable:
+    # Cache điểm cấu trúc Tốt theo pawn key. Cấu trúc Tốt lặp lại rất nhiều trong một
+    # lần search (đa số nước đi không động đến Tốt) nên hầu hết lần tra đều trúng.
+    # Mỗi entry: (mg, eg) của cấu trúc Tốt và một dict lá chắn Vua theo ô của Vua.
+
+    def __init__(self, size=PAWN_TABLE_SIZE):
+        self.size = size
+        self.keys = [None] * size
+        self.mg = [0] * size
+        self.eg = [0] * size
+        self.shelters = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.shelters = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, board, key):
+        # Trả về (mg, eg) của cấu trúc Tốt + lá chắn Vua, theo góc nhìn phe Trắng
+        idx = key & (self.size - 1)
+        if self.keys[idx] == key:
+            self.hits += 1
+            shelters = self.shelters[idx]
+        else:
+            self.misses += 1
+            white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+            black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+            mg, eg = structure_score(white_pawns, black_pawns)
+            self.keys[idx] = key
+            self.mg[idx] = mg
+            self.eg[idx] = eg
+            shelters = self.shelters[idx] = {}
+
+        mg = self.mg[idx]
+        # Lá chắn Vua phụ thuộc vào ô của Vua (không nằm trong key), cache riêng trong entry
+        white_king = board.king(chess.WHITE)
+        black_king = board.king(chess.BLACK)
+        king_key = (white_king << 6) | black_king if white_king is not None and black_king is not None else -1
+        shelter = shelters.get(king_key)
+        if shelter is None:
+            shelter = 0
+            if king_key >= 0:
+                white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+                black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+                shelter = (shelter_penalty(chess.BLACK, black_king, black_pawns, white_pawns)
+                           - shelter_penalty(chess.WHITE, white_king, white_pawns, black_pawns))
+            shelters[king_key] = shelter
+        return mg + shelter, self.eg[idx]
+
+
+def structure_score(white_pawns, black_pawns):
+    # Tốt chồng, Tốt cô lập, Tốt thông của cả hai bên (góc nhìn phe Trắng)
+    mg = 0
+    eg = 0
+    for color, own, enemy, sign in ((chess.WHITE, white_pawns, black_pawns, 1),
+                                    (chess.BLACK, black_pawns, white_pawns, -1)):
+        for f in range(8):
+            count = (own & chess.BB_FILES[f]).bit_count()
+            if count > 1:
+                mg -= sign * DOUBLED_PENALTY[0] * (count - 1)
+                eg -= sign * DOUBLED_PENALTY[1] * (count - 1)
+            if count and not own & _ADJACENT_FILES[f]:
+                mg -= sign * ISOLATED_PENALTY[0] * count
+                eg -= sign * ISOLATED_PENALTY[1] * count
+
+        passed_mask = PASSED_MASK[color]
+        for sq in chess.scan_forward(own):
+            if not enemy & passed_mask[sq]:
+                rank = chess.square_rank(sq)
+                relative = rank if color == chess.WHITE else 7 - rank
+                mg += sign * PASSED_BONUS_MG[relative]
+                eg += sign * PASSED_BONUS_EG[relative]
+    return mg, eg
+
+
+def shelter_penalty(color, king_square, own_pawns, enemy_pawns):
+    # Điểm phạt (>= 0) cho lá chắn Tốt trên cột của Vua và hai cột bên cạnh
+    king_file = chess.square_file(king_square)
+    king_rank = chess.square_rank(king_square)
+    penalty = 0
+    for f in range(max(0, king_file - 1), min(7, king_file + 1) + 1):
+        ahead = own_pawns & FRONT_SPAN[color][chess.square(f, king_rank)]
+        if ahead:
+            nearest = chess.lsb(ahead) if color == chess.WHITE else chess.msb(ahead)
+            penalty += SHELTER_PENALTY[abs(chess.square_rank(nearest) - king_rank)]
+        else:
+            penalty += SHELTER_MISSING
+            if not enemy_pawns & chess.BB_FILES[f]:
+                penalty += SHELTER_OPEN_FILE
+    return penalty
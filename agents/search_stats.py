@@ -0,0 +1,129 @@
+# agents/search_stats.py
+def _rate(part, total):
+    return part / total if total else 0.0
+
+
+class SearchStats:
+    # Thống kê của một lần select_move (MinimaxAgent(collect_stats=True) -> agent.last_stats)
+    # source: 'search', 'parallel', 'book', 'tablebase' hoặc 'ponder' (dùng lại kết quả ponder)
+
+    def __init__(self, source='search'):
+        self.source = source
+        self.time = 0.0
+        self.nodes = 0
+        self.qnodes = 0
+        self.leaf_evals = 0
+        self.completed_depth = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.tb_hits = 0
+        self.tb_misses = 0
+        self.pawn_hits = 0
+        self.pawn_misses = 0
+        # Mỗi vòng iterative deepening: (depth, số node của riêng vòng đó, thời gian của vòng)
+        self.iterations = []
+
+    @property
+    def nps(self):
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        return _rate(self.first_move_cutoffs, self.beta_cutoffs)
+
+    @property
+    def tt_hit_rate(self):
+        return _rate(self.tt_hits, self.tt_hits + self.tt_misses)
+
+    @property
+    def pawn_hit_rate(self):
+        return _rate(self.pawn_hits, self.pawn_hits + self.pawn_misses)
+
+    def branching_factors(self):
+        # Hệ số phân nhánh hiệu dụng: số node vòng d / số node vòng d-1
+        return [
+            (depth, nodes / prev_nodes if prev_nodes else 0.0)
+            for (_, prev_nodes, _), (depth, nodes, _) in zip(self.iterations, self.iterations[1:])
+        ]
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'time': self.time,
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'leaf_evals': self.leaf_evals,
+            'nps': self.nps,
+            'completed_depth': self.completed_depth,
+            'beta_cutoffs': self.beta_cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'tt_hits': self.tt_hits,
+            'tt_misses': self.tt_misses,
+            'tt_hit_rate': self.tt_hit_rate,
+            'tb_hits': self.tb_hits,
+            'tb_misses': self.tb_misses,
+            'pawn_hits': self.pawn_hits,
+            'pawn_misses': self.pawn_misses,
+            'pawn_hit_rate': self.pawn_hit_rate,
+            'iterations': [
+                {'depth': depth, 'nodes': nodes, 'time': elapsed}
+                for depth, nodes, elapsed in self.iterations
+            ],
+            'branching_factors': dict(self.branching_factors()),
+        }
+
+    def summary(self):
+        return (f"depth {self.completed_depth}, {self.nodes} node ({self.qnodes} q), "
+                f"{self.nps:,.0f} node/s, cut nước đầu {self.first_move_cutoff_rate:.0%}, "
+                f"TT hit {self.tt_hit_rate:.0%}")
+
+
+class StatsAccumulator:
+    # Cộng dồn SearchStats của nhiều nước (ví dụ cả một giải đấu trong benchmark.py)
+
+    COUNTERS = ('time', 'nodes', 'qnodes', 'leaf_evals', 'beta_cutoffs', 'first_move_cutoffs',
+                'tt_hits', 'tt_misses', 'tb_hits', 'tb_misses', 'pawn_hits', 'pawn_misses')
+
+    def __init__(self):
+        self.moves = 0
+        self.sources = {}
+        self.totals = {name: 0 for name in self.COUNTERS}
+        # depth -> [số node, thời gian, số lần] của các vòng iterative deepening
+        self.per_depth = {}
+
+    def add(self, stats):
+        self.moves += 1
+        self.sources[stats.source] = self.sources.get(stats.source, 0) + 1
+        for name in self.COUNTERS:
+            self.totals[name] += getattr(stats, name)
+        for depth, nodes, elapsed in stats.iterations:
+            entry = self.per_depth.setdefault(depth, [0, 0.0, 0])
+            entry[0] += nodes
+            entry[1] += elapsed
+            entry[2] += 1
+
+    def to_dict(self):
+        t = self.totals
+        per_depth = {
+            depth: {'avg_nodes': nodes / count, 'avg_time': elapsed / count, 'count': count}
+            for depth, (nodes, elapsed, count) in sorted(self.per_depth.items())
+        }
+        depths = list(per_depth)
+        return {
+            'moves': self.moves,
+            'sources': dict(self.sources),
+            **t,
+            'nps': t['nodes'] / t['time'] if t['time'] > 0 else 0.0,
+            'avg_time_per_move': _rate(t['time'], self.moves),
+            'first_move_cutoff_rate': _rate(t['first_move_cutoffs'], t['beta_cutoffs']),
+            'tt_hit_rate': _rate(t['tt_hits'], t['tt_hits'] + t['tt_misses']),
+            'pawn_hit_rate': _rate(t['pawn_hits'], t['pawn_hits'] + t['pawn_misses']),
+            'per_depth': per_depth,
+            'branching_factors': {
+                depth: _rate(per_depth[depth]['avg_nodes'], per_depth[prev]['avg_nodes'])
+                for prev, depth in zip(depths, depths[1:])
+            },
+        }
@@ -0,0 +1,103 @@
+# agents/tablebase.py
+import os
+
+import chess
+import chess.syzygy
+
+from agents.transposition_table import board_key
+
+# Số entry tối đa của cache kết quả probe WDL, vượt quá thì xoá hết làm lại
+PROBE_CACHE_SIZE = 1 << 18
+
+
+class SyzygyTablebase:
+    # Bảng tàn cuộc Syzygy (.rtbw: thắng/hoà/thua, .rtbz: số nước đến lần ăn quân/đi tốt kế tiếp)
+    # đọc từ thư mục cục bộ qua chess.syzygy. Mỗi process dựng một instance riêng nên
+    # cache probe cũng là riêng của process đó (kể cả các worker của parallel search).
+
+    def __init__(self, path, cache_size=PROBE_CACHE_SIZE):
+        self.path = path
+        self.tablebase = None
+        self.max_pieces = 0
+        self.cache_size = cache_size
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isdir(path):
+            print(f"[Syzygy] CẢNH BÁO: Không tìm thấy thư mục tablebase {path}")
+            return
+        try:
+            tablebase = chess.syzygy.open_tablebase(path)
+        except Exception as e:
+            print(f"[Syzygy] LỖI mở tablebase {path}: {e}")
+            return
+        if not tablebase.wdl:
+            print(f"[Syzygy] CẢNH BÁO: Thư mục {path} không có file .rtbw nào")
+            tablebase.close()
+            return
+
+        self.tablebase = tablebase
+        # Tên bảng dạng "KQvKR": số quân = số chữ cái trừ chữ 'v'
+        self.max_pieces = max(len(name) - 1 for name in tablebase.wdl)
+
+    def can_probe(self, board):
+        return (self.tablebase is not None and not board.castling_rights
+                and chess.popcount(board.occupied) <= self.max_pieces)
+
+    def probe_wdl(self, board, key=None):
+        # 2 / 1 / 0 / -1 / -2 theo góc nhìn bên đi (1, -1: thắng/thua nhưng bị luật 50 nước
+        # biến thành hoà), None nếu thiếu bảng cho thế cờ này
+        if key is None:
+            key = board_key(board)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        if not isinstance(board, chess.Board):
+            # CompactBoard của search: chỉ dựng lại chess.Board khi thật sự phải đọc bảng
+            board = board.to_board()
+        wdl = self.tablebase.get_wdl(board)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = wdl
+        return wdl
+
+    def root_moves(self, board, legal_moves):
+        # Xếp hạng các nước ở root bằng WDL + DTZ, trả về (wdl, danh sách nước nên xét)
+        # hoặc None nếu không probe được. Thế thắng: chỉ còn một nước tối ưu theo DTZ
+        # (chiếu hết ngay, hoặc về lần ăn quân/đi tốt nhanh nhất); thế thua: nước kéo dài
+        # nhất; thế hoà: mọi nước giữ hoà để search chọn tiếp.
+        if not self.can_probe(board):
+            return None
+
+        ranked = []
+        for move in legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            if board.is_checkmate():
+                board.pop()
+                return 2, [move]
+            wdl = self.tablebase.get_wdl(board)
+            dtz = self.tablebase.get_dtz(board)
+            board.pop()
+
+            if wdl is None:
+                return None
+            # Số ply đến lần reset luật 50 nước tính từ root khi đi nước này
+            distance = 1 if zeroing or dtz is None else abs(dtz) + 1
+            ranked.append((-wdl, distance, dtz is not None, move))
+
+        best_wdl = max(r[0] for r in ranked)
+        candidates = [r for r in ranked if r[0] == best_wdl]
+        if best_wdl == 0 or not all(r[2] for r in candidates):
+            return best_wdl, [r[3] for r in candidates]
+        if best_wdl > 0:
+            return best_wdl, [min(candidates, key=lambda r: r[1])[3]]
+        return best_wdl, [max(candidates, key=lambda r: r[1])[3]]
+
+    def close(self):
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
@@ -0,0 +1,115 @@
+# agents/transposition_table.py
+import chess
+import chess.polyglot
+
+# Loại cận của điểm lưu trong bảng
+EXACT = 0   # điểm chính xác (alpha < score < beta)
+LOWER = 1   # fail-high: điểm thật >= score
+UPPER = 2   # fail-low : điểm thật <= score
+
+# Ước lượng bộ nhớ cho 1 entry (6 ô list + object int 64-bit của key)
+ENTRY_BYTES = 104
+
+# Generation quay vòng trong khoảng [0, GENERATION_CYCLE)
+GENERATION_CYCLE = 256
+
+
+def encode_move(move):
+    # Nén nước đi thành 1 số nguyên nhỏ: from | to << 6 | promotion << 12
+    # 0 (a1a1) không phải nước hợp lệ nên dùng làm giá trị "không có nước"
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    if not code:
+        return None
+    promotion = code >> 12
+    return chess.Move(code & 63, (code >> 6) & 63, promotion or None)
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+
+        # Lưu theo các list song song thay vì object/tuple cho mỗi entry
+        # để bộ nhớ cố định và không tạo rác trong lúc search
+        self.keys = [None] * self.size
+        self.depths = [0] * self.size
+        self.flags = [0] * self.size
+        self.scores = [0] * self.size
+        self.moves = [0] * self.size
+        # Generation (tuổi) của lần search đã ghi/đọc entry gần nhất
+        self.gens = [0] * self.size
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        # Gọi ở đầu mỗi lần search: các entry cũ vẫn được dùng khi tra bảng,
+        # nhưng bị coi là "già" và nhường chỗ cho entry của lần search hiện tại
+        self.generation = (self.generation + 1) % GENERATION_CYCLE
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        # Trả về (depth, flag, score, move) hoặc None nếu không có entry khớp key,
+        # move ở dạng số nguyên (encode_move, 0 = không có nước)
+        idx = key % self.size
+        if self.keys[idx] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Entry vẫn còn hữu ích cho lần search này thì làm "trẻ" lại
+        self.gens[idx] = self.generation
+        return self.depths[idx], self.flags[idx], self.scores[idx], self.moves[idx]
+
+    def store(self, key, depth, flag, score, move):
+        # Chính sách thay thế (depth-preferred có tính tuổi):
+        # - ô trống hoặc cùng vị trí: luôn ghi đè (thông tin mới nhất)
+        # - entry từ lần search trước (generation cũ): luôn ghi đè
+        # - entry cùng lần search: chỉ ghi đè khi độ sâu mới >= độ sâu đang lưu,
+        #   để các kết quả search sâu (đắt) không bị các node lá đẩy ra
+        idx = key % self.size
+        old_key = self.keys[idx]
+        if (old_key is not None and old_key != key
+                and self.gens[idx] == self.generation and depth < self.depths[idx]):
+            return
+
+        # Giữ lại nước tốt cũ nếu lần search này không tìm được (fail-low)
+        if not move and old_key == key:
+            move = self.moves[idx]
+
+        self.keys[idx] = key
+        self.depths[idx] = depth
+        self.flags[idx] = flag
+        self.scores[idx] = score
+        self.moves[idx] = move
+        self.gens[idx] = self.generation
+
+    def hashfull(self):
+        # Tỉ lệ (phần nghìn) số ô đã dùng, lấy mẫu 1000 ô đầu như UCI
+        sample = min(self.size, 1000)
+        used = sum(1 for i in range(sample) if self.keys[i] is not None)
+        return used * 1000 // sample
+
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+
+def board_key(board):
+    return chess.polyglot.zobrist_hash(board)
+
+
+def piece_key(piece_type, color, square):
+    # Zobrist key của một quân trên một ô, cùng cách đánh chỉ số với chess.polyglot
+    # (pivot 0 = Đen, 1 = Trắng). Dùng để dựng key riêng phần, vd. pawn key
+    return _RANDOM[64 * ((piece_type - 1) * 2 + int(color)) + square]
@@ -1,28 +1,39 @@
 # benchmark.py
 import chess
+import importlib.util
+import json
 import time
 import sys
 import os
 from agents.random_agent import RandomAgent
 from agents.minimax_agent import MinimaxAgent
-try:
-    from agents.mlp_agent import MLPAgent
-    HAS_MLP_AGENT = True
-except ImportError:
-    HAS_MLP_AGENT = False
+from agents.search_stats import StatsAccumulator
+# Agent dùng MLP (NumPy/CuPy) chỉ được import khi chọn chế độ cần đến chúng
+HAS_MLP_AGENT = importlib.util.find_spec('numpy') is not None
 
+BOOK_PATH = 'training/book.bin'
+SYZYGY_PATH = 'training/syzygy'
 
-def play_single_game(agent_white, agent_black, game_id, quiet=True):
+
+def play_single_game(agent_white, agent_black, game_id, quiet=True, search_stats=None):
+    # search_stats: {chess.WHITE: StatsAccumulator, chess.BLACK: ...} để cộng dồn
+    # agent.last_stats sau mỗi nước (agent tạo với collect_stats=True)
     board = chess.Board()
     moves_count = 0
+
+    # Agent giữ bảng search giữa các nước (MinimaxAgent) cần được báo ván mới
+    for agent in (agent_white, agent_black):
+        if hasattr(agent, 'new_game'):
+            agent.new_game()
     
     while not board.is_game_over():
         moves_count += 1
         
-        if board.turn == chess.WHITE:
-            move = agent_white.select_move(board)
-        else:
-            move = agent_black.select_move(board)
+        agent = agent_white if board.turn == chess.WHITE else agent_black
+        move = agent.select_move(board)
+
+        if search_stats is not None and getattr(agent, 'last_stats', None) is not None:
+            search_stats[board.turn].add(agent.last_stats)
         
         if move is None:
             break
@@ -47,12 +58,18 @@ def play_single_game(agent_white, agent_black, game_id, quiet=True):
     return winner
 
 
-def run_tournament(agent_white, agent_black, num_games, label_white="White", label_black="Black"):
+def run_tournament(agent_white, agent_black, num_games, label_white="White", label_black="Black",
+                   stats_json=None):
     stats = {
         "white_wins": 0,
         "black_wins": 0,
         "draws": 0
     }
+
+    # Thống kê search cộng dồn cả giải (chỉ có với agent bật collect_stats)
+    search_stats = None
+    if any(getattr(agent, 'collect_stats', False) for agent in (agent_white, agent_black)):
+        search_stats = {chess.WHITE: StatsAccumulator(), chess.BLACK: StatsAccumulator()}
     
     print(f"\n>>> KHỞI ĐỘNG GIẢI ĐẤU ({num_games} VÁN) <<<")
     print(f"Phe Trắng: {label_white}")
@@ -66,7 +83,7 @@ def run_tournament(agent_white, agent_black, num_games, label_white="White", lab
         sys.stdout.flush()
         
         # Chạy một ván dưới chế độ quiet để tối ưu tốc độ.
-        winner = play_single_game(agent_white, agent_black, i, quiet=True)
+        winner = play_single_game(agent_white, agent_black, i, quiet=True, search_stats=search_stats)
         
         # Cập nhật thống kê
         if winner == chess.WHITE:
@@ -99,6 +116,32 @@ def run_tournament(agent_white, agent_black, num_games, label_white="White", lab
     print(f"ĐEN   ({label_black}): {stats['black_wins']} thắng \t({win_rate_black:.1f}%)")
     print(f"HÒA                  : {stats['draws']} ván   \t({draw_rate:.1f}%)")
     print("=" * 50)
+
+    if search_stats is not None:
+        summary = {}
+        for color, label, agent in ((chess.WHITE, label_white, agent_white), (chess.BLACK, label_black, agent_black)):
+            data = search_stats[color].to_dict()
+            summary['white' if color == chess.WHITE else 'black'] = {'label': label, **data}
+            if data['nodes']:
+                # MCTS không dùng alpha-beta / TT: không có số cắt tỉa và TT hit
+                fields = [f"{data['moves']} nước", f"{data['nodes']} node", f"{data['nps']:,.0f} node/s"]
+                if 'mcts' not in data['sources']:
+                    fields += [f"cut nước đầu {data['first_move_cutoff_rate']:.0%}", f"TT hit {data['tt_hit_rate']:.0%}"]
+                fields.append(f"{data['avg_time_per_move']:.3f} s/nước")
+                print(f"[SEARCH] {label}: " + ", ".join(fields))
+                if data['leaf_evals'] and data['time'] > 0:
+                    # Agent có engine MLP (Hybrid đã load model, MCTS) chấm lá bằng mạng;
+                    # Minimax (và Hybrid không có model) đếm số lần gọi hàm đánh giá PST
+                    rate = data['leaf_evals'] / data['time']
+                    if getattr(agent, 'engine', None) is not None:
+                        print(f"[SEARCH] {label}: {data['leaf_evals']} lá qua MLP, {rate:,.0f} lá/s")
+                    else:
+                        print(f"[SEARCH] {label}: {data['leaf_evals']} lần gọi hàm đánh giá, {rate:,.0f} lần/s")
+        if stats_json:
+            summary['results'] = dict(stats, num_games=num_games, total_time=total_time)
+            with open(stats_json, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            print(f"[INFO] Đã ghi thống kê search vào {stats_json}")
     
     if label_white.startswith("Minimax") and label_black == "Random":
         if win_rate_white >= 90:
@@ -121,6 +164,9 @@ if __name__ == "__main__":
     print("1. Minimax (Trắng) vs Random (Đen)")
     print("2. Random (Trắng) vs Minimax (Đen)")
     print("3. Minimax vs Minimax")
+    print("6. Minimax D3 + Quiescence vs Minimax D4 (không quiescence)")
+    print("7. Minimax D4 (không quiescence) vs Minimax D3 + Quiescence")
+    print("8. Minimax D4 selective (null-move/LMR/futility) vs Minimax D4 full-width")
     
     menu_mode = "BASIC"
     
@@ -129,6 +175,8 @@ if __name__ == "__main__":
         print("-" * 40)
         print("4. MLP Agent vs Random")
         print("5. MLP Agent vs Minimax")
+        print("9. Hybrid (Minimax + MLP theo batch) vs Minimax")
+        print("10. MCTS (MLP theo batch, virtual loss) vs Minimax")
     
     choice = input("\n>>> Chọn cặp đấu (nhập số): ")
     
@@ -138,9 +186,16 @@ if __name__ == "__main__":
         num_games = 10
         print("Input không hợp lệ, mặc định chạy 10 ván.")
 
+    # Thống kê search (node/s, cutoff, TT hit...) của các MinimaxAgent được ghi ra JSON nếu muốn
+    stats_json = input(">>> File JSON thống kê search (Enter để bỏ qua): ").strip() or None
+
     minimax_depth = 3
-    minimax_p1 = MinimaxAgent(depth=minimax_depth)
-    minimax_p2 = MinimaxAgent(depth=minimax_depth)
+    # Dùng sách khai cuộc nếu đã tạo (python training/build_book.py)
+    book_path = BOOK_PATH if os.path.exists(BOOK_PATH) else None
+    # Tablebase Syzygy cho tàn cuộc nếu đã tải về thư mục SYZYGY_PATH
+    syzygy_path = SYZYGY_PATH if os.path.isdir(SYZYGY_PATH) else None
+    minimax_p1 = MinimaxAgent(depth=minimax_depth, book_path=book_path, syzygy_path=syzygy_path, collect_stats=True)
+    minimax_p2 = MinimaxAgent(depth=minimax_depth, book_path=book_path, syzygy_path=syzygy_path, collect_stats=True)
     random_p = RandomAgent()
     
     def load_mlp():
@@ -149,26 +204,54 @@ if __name__ == "__main__":
         model_file = 'training/best_model_mlp.npz'
         if os.path.exists(model_file):
             print(f"[INFO] Đang nạp model từ {model_file}...")
-            return MLPAgent(model_path=model_file)
+            from agents.mlp_agent import MLPAgent
+            return MLPAgent(model_path=model_file, book_path=book_path)
         print(f"[LỖI] Không tìm thấy file trọng số {model_file}. Vui lòng train trước.")
         return None
     
     if choice == '1':
-        run_tournament(minimax_p1, random_p, num_games, f"Minimax(D{minimax_depth})", "Random")
+        run_tournament(minimax_p1, random_p, num_games, f"Minimax(D{minimax_depth})", "Random", stats_json=stats_json)
     elif choice == '2':
-        run_tournament(random_p, minimax_p2, num_games, "Random", f"Minimax(D{minimax_depth})")
+        run_tournament(random_p, minimax_p2, num_games, "Random", f"Minimax(D{minimax_depth})", stats_json=stats_json)
     elif choice == '3':
-        run_tournament(minimax_p2, minimax_p1, num_games, "Minimax A", "Minimax B")
+        run_tournament(minimax_p2, minimax_p1, num_games, "Minimax A", "Minimax B", stats_json=stats_json)
+    elif choice in ('6', '7'):
+        minimax_q = MinimaxAgent(depth=3, use_quiescence=True, collect_stats=True)
+        minimax_d4 = MinimaxAgent(depth=4, use_quiescence=False, collect_stats=True)
+        if choice == '6':
+            run_tournament(minimax_q, minimax_d4, num_games, "Minimax(D3+Q)", "Minimax(D4)", stats_json=stats_json)
+        else:
+            run_tournament(minimax_d4, minimax_q, num_games, "Minimax(D4)", "Minimax(D3+Q)", stats_json=stats_json)
+    elif choice == '8':
+        minimax_sel = MinimaxAgent(depth=4, collect_stats=True)
+        minimax_full = MinimaxAgent(depth=4, use_null_move=False, use_lmr=False, use_futility=False, collect_stats=True)
+        run_tournament(minimax_sel, minimax_full, num_games, "Minimax(D4 selective)", "Minimax(D4 full-width)", stats_json=stats_json)
             
     elif menu_mode == "MLP_ONLY":
         if choice == '4':
             agent = load_mlp()
             if agent:
-                run_tournament(agent, random_p, num_games, "MLP Agent (Scratch)", "Random")
+                run_tournament(agent, random_p, num_games, "MLP Agent (Scratch)", "Random", stats_json=stats_json)
         elif choice == '5':
             agent = load_mlp()
             if agent:
-                run_tournament(agent, minimax_p2, num_games, "MLP Agent (Scratch)", "Minimax")
+                run_tournament(agent, minimax_p2, num_games, "MLP Agent (Scratch)", "Minimax", stats_json=stats_json)
+        elif choice == '9':
+            model_file = 'training/best_model_mlp.npz'
+            if os.path.exists(model_file):
+                from agents.hybrid_agent import HybridAgent
+                hybrid = HybridAgent(model_path=model_file, depth=minimax_depth, collect_stats=True)
+                run_tournament(hybrid, minimax_p2, num_games, f"Hybrid(D{minimax_depth})", "Minimax", stats_json=stats_json)
+            else:
+                print(f"[LỖI] Không tìm thấy file trọng số {model_file}. Vui lòng train trước.")
+        elif choice == '10':
+            model_file = 'training/best_model_mlp.npz'
+            if os.path.exists(model_file):
+                from agents.mcts_agent import MCTSAgent
+                mcts = MCTSAgent(model_path=model_file, simulations=800, batch_size=16, collect_stats=True)
+                run_tournament(mcts, minimax_p2, num_games, "MCTS(800 sim)", "Minimax", stats_json=stats_json)
+            else:
+                print(f"[LỖI] Không tìm thấy file trọng số {model_file}. Vui lòng train trước.")
         else:
             print("Lựa chọn không hợp lệ.")
     else:
@@ -0,0 +1,65 @@
+# benchmark_eval.py
+import argparse
+import random
+import time
+
+import chess
+
+from agents.minimax_agent import MinimaxAgent
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmark hàm đánh giá của MinimaxAgent (positions/sec)")
+    parser.add_argument('--positions', type=int, default=2000, help='Số thế cờ ngẫu nhiên dùng để đo.')
+    parser.add_argument('--repeat', type=int, default=5, help='Số lần lặp lại toàn bộ tập thế cờ.')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def random_positions(n, seed):
+    # Sinh thế cờ bằng cách đi ngẫu nhiên từ thế khởi đầu, lấy đủ các giai đoạn ván cờ
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        positions.append(board)
+    return positions
+
+
+def measure(fn, positions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in positions:
+            fn(board)
+    elapsed = time.perf_counter() - start
+    return len(positions) * repeat / elapsed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    positions = random_positions(args.positions, args.seed)
+
+    agent_scan = MinimaxAgent(eval_backend='scan')
+    agent_bb = MinimaxAgent(eval_backend='bitboard')
+
+    # Hai backend phải cho cùng kết quả trước khi so tốc độ
+    for board in positions:
+        assert agent_bb.evaluator.compute(board) == agent_scan.evaluate_material_full(board), board.fen()
+
+    print(f"--- EVAL BENCHMARK ({len(positions)} thế cờ x {args.repeat} lần) ---")
+
+    pps_scan = measure(agent_scan.evaluate_material_full, positions, args.repeat)
+    pps_bb = measure(agent_bb.evaluator.compute, positions, args.repeat)
+    print(f"Material+PST  scan 64 ô : {pps_scan:12,.0f} pos/s")
+    print(f"Material+PST  bitboard  : {pps_bb:12,.0f} pos/s  (x{pps_bb / pps_scan:.1f})")
+
+    # evaluate_board đầy đủ (gồm kiểm tra chiếu hết / hòa)
+    pps_scan = measure(agent_scan.evaluate_board, positions, args.repeat)
+    pps_bb = measure(agent_bb.evaluate_board, positions, args.repeat)
+    print(f"evaluate_board scan     : {pps_scan:12,.0f} pos/s")
+    print(f"evaluate_board bitboard : {pps_bb:12,.0f} pos/s  (x{pps_bb / pps_scan:.1f})")
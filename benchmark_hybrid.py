@@ -0,0 +1,54 @@
+# benchmark_hybrid.py
+import argparse
+import os
+import time
+
+import chess
+
+from agents.hybrid_agent import HybridAgent
+from training.model_mlp import ChessMLP_Scratch
+
+TEST_FENS = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N2N2/PP2BPPP/R2QKB1R w KQ - 0 8",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="So sánh NPS của HybridAgent: đánh giá MLP theo batch vs từng node")
+    parser.add_argument('--model-path', type=str, default='training/best_model_mlp.npz')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--batch-sizes', type=str, default='1,8,16,64',
+                        help='Danh sách batch size, 1 = đánh giá từng node.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    # Tốc độ forward không phụ thuộc giá trị trọng số: chưa train thì dùng trọng số ngẫu nhiên
+    model = ChessMLP_Scratch()
+    if os.path.exists(args.model_path):
+        model.load_weights(args.model_path)
+    else:
+        print(f"[INFO] Không có {args.model_path}, dùng trọng số khởi tạo ngẫu nhiên (chỉ đo tốc độ).")
+
+    print(f"--- HYBRID BENCHMARK (depth {args.depth}, {len(TEST_FENS)} thế cờ) ---")
+    for batch_size in batch_sizes:
+        agent = HybridAgent(model_path=args.model_path, batch_size=batch_size, depth=args.depth)
+        agent.model = model
+
+        nodes = 0
+        leaf_evals = 0
+        start = time.perf_counter()
+        for fen in TEST_FENS:
+            agent.select_move(chess.Board(fen))
+            nodes += agent.nodes
+            leaf_evals += agent.leaf_evals
+        elapsed = time.perf_counter() - start
+
+        print(f"batch={batch_size:4d}: {elapsed:7.2f}s  nodes={nodes:8d}  leaf evals={leaf_evals:8d}  "
+              f"{nodes / elapsed:9,.0f} node/s  {leaf_evals / elapsed:9,.0f} eval/s")
@@ -0,0 +1,75 @@
+# benchmark_inference.py
+import argparse
+import os
+import random
+import time
+
+import chess
+
+from training.model_mlp import ChessMLP_Scratch, xp
+from utils import boards_to_array
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="So sánh positions/sec của ChessMLP_Scratch.forward và chế độ suy luận (InferenceMLP)")
+    parser.add_argument('--model-path', type=str, default='training/best_model_mlp.npz')
+    parser.add_argument('--batch-sizes', type=str, default='1,16,64,256',
+                        help='Danh sách batch size cần đo.')
+    parser.add_argument('--positions', type=int, default=2048, help='Số thế cờ dùng để đo.')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def random_positions(count, seed):
+    # Thế cờ lấy từ các ván đi ngẫu nhiên (chỉ cần phân bố quân giống ván thật để đo tốc độ)
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 120:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def positions_per_second(forward, X, batch_size):
+    # Chạy hết X theo từng batch, lặp lại đến khi đủ ~0.5s để số đo ổn định
+    n = X.shape[0] - X.shape[0] % batch_size
+    forward(X[:batch_size])
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for i in range(0, n, batch_size):
+            forward(X[i:i + batch_size])
+        done += n
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.5:
+            return done / elapsed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    # Tốc độ forward không phụ thuộc giá trị trọng số: chưa train thì dùng trọng số ngẫu nhiên
+    model = ChessMLP_Scratch()
+    if os.path.exists(args.model_path):
+        model.load_weights(args.model_path)
+    else:
+        print(f"[INFO] Không có {args.model_path}, dùng trọng số khởi tạo ngẫu nhiên (chỉ đo tốc độ).")
+    engine = model.inference_engine(max(batch_sizes))
+
+    X = xp.asarray(boards_to_array(random_positions(args.positions, args.seed)))
+    reference = model.forward(X)
+    diff = float(xp.abs(engine.forward(X) - reference).max())
+
+    print(f"--- INFERENCE BENCHMARK ({args.positions} thế cờ, backend {xp.__name__}) ---")
+    print(f"Sai khác lớn nhất so với forward gốc: {diff:.2e}")
+    print(f"{'batch':>6s} {'forward (pos/s)':>16s} {'inference (pos/s)':>18s} {'nhanh hơn':>10s}")
+    for batch_size in batch_sizes:
+        base = positions_per_second(model.forward, X, batch_size)
+        fast = positions_per_second(engine.forward, X, batch_size)
+        print(f"{batch_size:6d} {base:16,.0f} {fast:18,.0f} {fast / base:9.2f}x")
@@ -0,0 +1,58 @@
+# benchmark_smp.py
+import argparse
+import multiprocessing as mp
+import time
+
+import chess
+
+from agents.minimax_agent import MinimaxAgent
+
+# Một số thế cờ trung cuộc có nhiều nước đi hợp lệ để chia việc cho các worker
+TEST_FENS = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N2N2/PP2BPPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Đo time-to-depth của MinimaxAgent khi tăng số worker process")
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--max-workers', type=int, default=mp.cpu_count())
+    return parser.parse_args()
+
+
+def time_to_depth(agent):
+    total = 0.0
+    nodes = 0
+    for fen in TEST_FENS:
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        agent.select_move(board)
+        total += time.perf_counter() - start
+        nodes += agent.nodes
+    return total, nodes
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"--- SMP BENCHMARK (depth {args.depth}, {len(TEST_FENS)} thế cờ, {mp.cpu_count()} CPU) ---")
+
+    # Ngoài thời gian, in số node so với 1 worker: chia ở root mất một phần cắt tỉa nên
+    # speedup tối đa khoảng (số core thật) / (tỉ lệ node), chưa tính chi phí giữa các process
+    baseline = None
+    baseline_nodes = None
+    for workers in range(1, args.max_workers + 1):
+        agent = MinimaxAgent(depth=args.depth, workers=workers)
+        # Lượt chạy khởi động để không tính thời gian tạo process pool
+        agent.select_move(chess.Board(), node_limit=1000)
+
+        elapsed, nodes = time_to_depth(agent)
+        agent.close()
+
+        if baseline is None:
+            baseline = elapsed
+            baseline_nodes = nodes
+        print(f"workers={workers:2d}: {elapsed:7.2f}s  nodes={nodes:9d} (x{nodes / baseline_nodes:.2f})  "
+              f"speedup x{baseline / elapsed:.2f}")
@@ -0,0 +1,94 @@
+# benchmark_startup.py
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Các kịch bản khởi động, mỗi kịch bản chạy trong một process Python mới:
+# (tên, code, có phải chế độ chỉ dùng Random/Minimax không)
+SCENARIOS = [
+    ('python', "pass", False),
+    ('minimax', "from agents.minimax_agent import MinimaxAgent\nMinimaxAgent(depth=3)", True),
+    ('main', "import main", True),
+    ('benchmark', "import benchmark", True),
+    ('gui_game', "import gui_game", True),
+    ('mlp', "from agents.mlp_agent import MLPAgent", False),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động (import + tạo agent) của các entry point bằng python -X importtime")
+    parser.add_argument('--repeat', type=int, default=3, help='Số lần chạy mỗi kịch bản (lấy thời gian nhỏ nhất).')
+    parser.add_argument('--top', type=int, default=5, help='Số module import tốn thời gian nhất được in ra.')
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='Ngưỡng (giây) cho các kịch bản chỉ dùng Random/Minimax.')
+    parser.add_argument('--only', type=str, default=None, help='Chỉ chạy các kịch bản này (phân cách bởi dấu phẩy).')
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    # Dòng "import time: self [us] | cumulative | tên" -> [(tên, self giây, cumulative giây, mức lồng)]
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6, depth))
+    return entries
+
+
+def run_scenario(code, repeat):
+    best_wall = None
+    best_entries = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''
+            return None, last_line
+        if best_wall is None or wall < best_wall:
+            best_wall = wall
+            best_entries = parse_importtime(result.stderr)
+    return best_wall, best_entries
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    selected = set(args.only.split(',')) if args.only else None
+    failures = 0
+
+    print(f"--- STARTUP BENCHMARK ({sys.executable}, lấy min của {args.repeat} lần) ---")
+    for name, code, minimax_only in SCENARIOS:
+        if selected is not None and name not in selected:
+            continue
+        if name == 'gui_game' and importlib.util.find_spec('pygame') is None:
+            print(f"{name:10s}: bỏ qua (chưa cài pygame)")
+            continue
+
+        wall, entries = run_scenario(code, args.repeat)
+        if wall is None:
+            print(f"{name:10s}: LỖI ({entries})")
+            continue
+
+        status = ''
+        if minimax_only:
+            status = 'OK' if wall < args.budget else f'CHẬM (> {args.budget:.1f}s)'
+            failures += wall >= args.budget
+        imports = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+        print(f"{name:10s}: {wall:6.3f}s (import {imports:.3f}s) {status}")
+
+        # Các module tốn nhiều thời gian import nhất (chỉ tính phần của riêng module, không
+        # gồm module con) kèm thời gian tính cả module con
+        top = sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]
+        for module, own, cumulative, _ in top:
+            print(f"    {own:6.3f}s  {module} (cả module con {cumulative:.3f}s)")
+
+    if failures:
+        print(f"{failures} kịch bản Random/Minimax khởi động chậm hơn {args.budget:.1f}s.")
@@ -1,5 +1,6 @@
 import pygame
 import chess
+import importlib.util
 import sys
 import os
 import threading
@@ -8,11 +9,9 @@ import requests
 from agents.random_agent import RandomAgent
 from agents.minimax_agent import MinimaxAgent
 
-try:
-    from agents.mlp_agent import MLPAgent
-    HAS_MLP = True
-except ImportError:
-    HAS_MLP = False
+# MLP Agent (NumPy/CuPy) chỉ được import khi chọn người chơi MLP lần đầu, xem get_agent()
+HAS_MLP = importlib.util.find_spec('numpy') is not None
+MLP_MODEL_PATH = 'training/best_model_mlp.npz'
 
 WIDTH, HEIGHT = 640, 640
 DIMENSION = 8
@@ -123,11 +122,6 @@ class ChessGameGUI:
             "Minimax": MinimaxAgent(depth=3),
             "MLP": None
         }
-        if HAS_MLP and os.path.exists('training/best_model_mlp.npz'):
-            try:
-                self.agents["MLP"] = MLPAgent(model_path='training/best_model_mlp.npz')
-            except:
-                print("[GUI] Lỗi load MLP Agent")
 
         # Trạng thái UI
         self.selected_square = None 
@@ -142,7 +136,15 @@ class ChessGameGUI:
 
         self.ai_move_result = None
 
+        # Pondering: AI search sẵn nước trả lời trong lúc người chơi đang nghĩ
+        self.ponder_enabled = True
+        self.ponder_thread = None
+        self.ponder_agent = None
+        # Search ponder đang chạy và còn có thể thành ponderhit (chưa bị huỷ)
+        self.ponder_active = False
+
     def reset_game(self):
+        self.stop_pondering()
         self.board = chess.Board()
         self.selected_square = None
         self.valid_moves = []
@@ -152,6 +154,10 @@ class ChessGameGUI:
         self.ai_thinking = False
         self.ai_move_result = None
 
+        for agent in self.agents.values():
+            if agent is not None and hasattr(agent, 'new_game'):
+                agent.new_game()
+
     def draw_board_background(self):
         colors = [COLOR_BOARD_LIGHT, COLOR_BOARD_DARK]
         for r in range(DIMENSION):
@@ -224,9 +230,59 @@ class ChessGameGUI:
         hint_rect = hint_surf.get_rect(center=(WIDTH//2, HEIGHT//2 + 40))
         self.screen.blit(hint_surf, hint_rect)
 
+    def get_agent(self, agent_type):
+        # Nạp MLP Agent ở lần đầu cần dùng để GUI khởi động nhanh khi chỉ chơi Random/Minimax
+        if agent_type == "MLP" and self.agents["MLP"] is None and HAS_MLP and os.path.exists(MLP_MODEL_PATH):
+            try:
+                from agents.mlp_agent import MLPAgent
+                self.agents["MLP"] = MLPAgent(model_path=MLP_MODEL_PATH)
+            except:
+                print("[GUI] Lỗi load MLP Agent")
+        return self.agents.get(agent_type)
+
+    def start_pondering(self, agent_type):
+        agent = self.agents.get(agent_type)
+        if not self.ponder_enabled or agent is None or not hasattr(agent, 'ponder'):
+            return
+        if self.ponder_thread is not None and self.ponder_thread.is_alive():
+            # Search ponder đã huỷ trước đó chưa dừng hẳn: bỏ qua lượt ponder này
+            return
+        # Đoán nước và xoá cờ stop ngay ở thread giao diện, trước khi thread search chạy:
+        # stop() / ponderhit() gọi ngay sau đó luôn có tác dụng
+        ponder_board = agent.prepare_ponder(self.board.copy())
+        if ponder_board is None:
+            return
+        self.ponder_agent = agent
+        self.ponder_active = True
+        self.ponder_thread = threading.Thread(target=agent.search_ponder, args=(ponder_board,), daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        # Chỉ yêu cầu dừng, không join ở thread giao diện: search ponder dừng ở lần kiểm tra
+        # giới hạn kế tiếp, lượt AI (get_ai_move_thread) chờ nó kết thúc trước khi search
+        if self.ponder_active:
+            self.ponder_agent.stop()
+        self.ponder_active = False
+
+    def on_human_move(self, move):
+        if not self.ponder_active:
+            return
+        if move == self.ponder_agent.ponder_move:
+            # Đoán trúng: để search ponder chạy tiếp, lượt AI sẽ chờ và dùng kết quả
+            self.ponder_agent.ponderhit()
+            self.ponder_active = False
+        else:
+            # Đoán sai: huỷ search ponder (TT đã "ấm" vẫn được dùng lại)
+            self.stop_pondering()
+
     def get_ai_move_thread(self, agent):
         try:
             time.sleep(0.1) 
+            if self.ponder_thread is not None and self.ponder_agent is agent:
+                # Chờ search ponder (đoán trúng hoặc đã huỷ) của chính agent này kết thúc
+                self.ponder_thread.join()
+                self.ponder_thread = None
+                self.ponder_agent = None
             move = agent.select_move(self.board.copy())
             self.ai_move_result = move 
         except Exception as e:
@@ -240,7 +296,7 @@ class ChessGameGUI:
     def trigger_ai_turn(self, agent_type):
         if self.ai_thinking: return
         
-        agent = self.agents.get(agent_type)
+        agent = self.get_agent(agent_type)
         if not agent:
             print("Agent not found/loaded")
             return
@@ -261,6 +317,7 @@ class ChessGameGUI:
                 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
+                        self.stop_pondering()
                         return # Quay về menu
                     if event.key == pygame.K_r:
                         self.reset_game()
@@ -298,6 +355,7 @@ class ChessGameGUI:
                                 self.last_move = move
                                 self.selected_square = None
                                 self.valid_moves = []
+                                self.on_human_move(move)
                             else:
                                 # Nếu click vào quân khác của mình -> Đổi lựa chọn
                                 piece = self.board.piece_at(clicked_sq)
@@ -312,6 +370,7 @@ class ChessGameGUI:
             # 2. Game Logic Check
             if self.board.is_game_over():
                 self.game_over = True
+                self.stop_pondering()
                 outcome = self.board.outcome()
                 if outcome.winner == chess.WHITE: self.result_text = "White WIN!"
                 elif outcome.winner == chess.BLACK: self.result_text = "Black WIN!"
@@ -335,6 +394,10 @@ class ChessGameGUI:
                             self.board.push(move)
                             self.last_move = move
                             self.ai_move_result = None
+
+                            next_type = self.player_white_type if self.board.turn == chess.WHITE else self.player_black_type
+                            if next_type == "Human" and not self.board.is_game_over():
+                                self.start_pondering(current_type)
                         else:
                             print("AI gặp lỗi hoặc đầu hàng!")
                             self.game_over = True
@@ -439,6 +502,9 @@ class ChessGameGUI:
             info_w = self.font_small.render(f"White (Press 1 to choose): {self.player_white_type}", True, (200, 200, 200))
             info_b = self.font_small.render(f"Black (Press 2 to choose): {self.player_black_type}", True, (200, 200, 200))
             start_txt = self.font.render("Press Enter to start", True, (0, 255, 0))
+            ponder_txt = self.font_small.render(
+                f"Pondering (Press P to toggle): {'ON' if self.ponder_enabled else 'OFF'}", True, (200, 200, 200)
+            )
 
             if self.last_game_moves:
                 replay_txt = self.font_small.render("Press R to replay last game", True, (173, 216, 230))
@@ -447,6 +513,7 @@ class ChessGameGUI:
             
             self.screen.blit(info_w, (WIDTH//2 - info_w.get_width()//2, 200))
             self.screen.blit(info_b, (WIDTH//2 - info_b.get_width()//2, 250))
+            self.screen.blit(ponder_txt, (WIDTH//2 - ponder_txt.get_width()//2, 300))
             self.screen.blit(start_txt, (WIDTH//2 - start_txt.get_width()//2, 400))
             self.screen.blit(replay_txt, (WIDTH//2 - replay_txt.get_width()//2, 440))
             
@@ -467,6 +534,9 @@ class ChessGameGUI:
                         idx = options.index(self.player_black_type)
                         self.player_black_type = options[(idx + 1) % len(options)]
 
+                    if event.key == pygame.K_p:
+                        self.ponder_enabled = not self.ponder_enabled
+
                     if event.key == pygame.K_r and self.last_game_moves:
                         self.replay_last_game()
 
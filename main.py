@@ -1,18 +1,20 @@
 # main.py
 import chess
+import importlib.util
 import time
 import os
 import sys
 from agents.random_agent import RandomAgent
 from agents.minimax_agent import MinimaxAgent
 
-try:
-    from agents.mlp_agent import MLPAgent
-    HAS_MLP_SCRATCH = True
-except ImportError:
-    HAS_MLP_SCRATCH = False
+# agents/mlp_agent.py (kéo theo NumPy/CuPy) chỉ được import khi chọn chế độ MLP
+HAS_MLP_SCRATCH = importlib.util.find_spec('agents.mlp_agent') is not None and importlib.util.find_spec('numpy') is not None
+if not HAS_MLP_SCRATCH:
     print("[CẢNH BÁO] Không tìm thấy file agents/mlp_agent.py. Chế độ MLP sẽ bị vô hiệu hóa.")
 
+BOOK_PATH = 'training/book.bin'
+SYZYGY_PATH = 'training/syzygy'
+
 
 def play_game(agent_white, agent_black, pause_time=0.1):
     
@@ -53,6 +55,9 @@ def play_game(agent_white, agent_black, pause_time=0.1):
         if move in board.legal_moves:
             board.push(move)
             print(f">>> {player_name} đi: {move} (Mất {end_time - start_time:.4f}s)")
+            stats = getattr(current_agent, 'last_stats', None)
+            if stats is not None:
+                print(f"    [{stats.source}] {stats.summary()}")
             print(board)
             print("-" * 40)
         else:
@@ -95,7 +100,11 @@ if __name__ == "__main__":
     choice = input(">>> Nhập số lựa chọn của bạn: ")
     
     random_player = RandomAgent()
-    minimax_player = MinimaxAgent(depth=3)
+    # Dùng sách khai cuộc nếu đã tạo (python training/build_book.py)
+    book_path = BOOK_PATH if os.path.exists(BOOK_PATH) else None
+    # Tablebase Syzygy cho tàn cuộc nếu đã tải về thư mục SYZYGY_PATH
+    syzygy_path = SYZYGY_PATH if os.path.isdir(SYZYGY_PATH) else None
+    minimax_player = MinimaxAgent(depth=3, book_path=book_path, syzygy_path=syzygy_path, collect_stats=True)
     
     white_player = None
     black_player = None
@@ -115,7 +124,8 @@ if __name__ == "__main__":
         
         if os.path.exists(model_path):
             print(f"[INFO] Đang khởi động AI từ file: {model_path}...")
-            mlp_player = MLPAgent(model_path=model_path) 
+            from agents.mlp_agent import MLPAgent
+            mlp_player = MLPAgent(model_path=model_path, book_path=book_path)
             
             if choice == '4':
                 white_player = mlp_player
@@ -0,0 +1,99 @@
+# perft.py
+import argparse
+import time
+
+import chess
+
+from agents.compact_board import CompactBoard, perft
+from agents.transposition_table import decode_move
+
+# Các thế cờ perft chuẩn (chessprogramming.org/Perft_Results) và số node đã biết
+PERFT_SUITE = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", [20, 400, 8902, 197281]),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862]),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467]),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379]),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890]),
+]
+
+
+def chess_perft(board, depth):
+    # Cùng cách đếm với compact_board.perft: ở depth 1 chỉ đếm số nước hợp lệ
+    if depth <= 1:
+        return board.legal_moves.count() if depth == 1 else 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def divide_mismatch(board, compact, depth):
+    # Tìm nước đầu tiên mà hai bộ đếm cho kết quả khác nhau (để gỡ lỗi)
+    expected = {move: None for move in board.legal_moves}
+    for move in compact.legal_moves():
+        chess_move = decode_move(move)
+        if chess_move not in expected:
+            return f"nước thừa {chess_move.uci()}"
+        board.push(chess_move)
+        compact.push(move)
+        if chess_perft(board, depth - 1) != perft(compact, depth - 1):
+            return f"sai sau {chess_move.uci()}"
+        board.pop()
+        compact.pop()
+        del expected[chess_move]
+    if expected:
+        return f"thiếu nước {', '.join(m.uci() for m in expected)}"
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Kiểm tra bộ sinh nước đi của CompactBoard bằng perft, so với python-chess")
+    parser.add_argument('--depth', type=int, default=3, help='Độ sâu tối đa cho mỗi thế cờ.')
+    parser.add_argument('--no-compare', action='store_true',
+                        help='Chỉ so với số node đã biết, không chạy perft bằng python-chess.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    failures = 0
+    compact_time = 0.0
+    chess_time = 0.0
+    compact_nodes = 0
+
+    for fen, known in PERFT_SUITE:
+        board = chess.Board(fen)
+        compact = CompactBoard.from_board(board)
+        key = compact.key
+        for depth in range(1, min(args.depth, len(known)) + 1):
+            start = time.perf_counter()
+            nodes = perft(compact, depth)
+            compact_time += time.perf_counter() - start
+            compact_nodes += nodes
+
+            expected = known[depth - 1]
+            if not args.no_compare:
+                start = time.perf_counter()
+                expected = chess_perft(board, depth)
+                chess_time += time.perf_counter() - start
+                if expected != known[depth - 1]:
+                    print(f"[PERFT] CẢNH BÁO: python-chess cho {expected}, bảng ghi {known[depth - 1]}")
+
+            status = "OK" if nodes == expected else "SAI"
+            print(f"{status:3s} depth {depth}: {nodes:8d} / {expected:8d}  {fen}")
+            if nodes != expected:
+                failures += 1
+                print(f"    -> {divide_mismatch(board, compact, depth)}")
+        if compact.key != key or compact.ply:
+            failures += 1
+            print(f"SAI: push/pop không khôi phục đúng thế cờ {fen}")
+
+    print(f"\nCompactBoard: {compact_nodes} node trong {compact_time:.2f}s "
+          f"({compact_nodes / compact_time:,.0f} node/s)")
+    if chess_time:
+        print(f"python-chess: {compact_nodes} node trong {chess_time:.2f}s "
+              f"({compact_nodes / chess_time:,.0f} node/s), nhanh hơn x{chess_time / compact_time:.2f}")
+    print("Tất cả khớp." if not failures else f"{failures} lỗi.")
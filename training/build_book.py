@@ -0,0 +1,139 @@
+# training/build_book.py
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+import chess
+import chess.pgn
+import chess.polyglot
+from tqdm import tqdm
+
+# Điểm cộng vào trọng số của một nước theo kết quả ván (góc nhìn bên đi nước đó)
+WIN_POINTS = 2
+DRAW_POINTS = 1
+
+MAX_WEIGHT = 0xFFFF
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tạo sách khai cuộc Polyglot (.bin) từ dữ liệu ván cờ PGN / parquet")
+    parser.add_argument('--pgn', type=str, default=None, help='File PGN đầu vào.')
+    parser.add_argument(
+        '--parquet',
+        type=str,
+        default=None,
+        help='File parquet (cùng định dạng với prepare_data_hf.py: cột moves_uci, winner).'
+    )
+    parser.add_argument('--output', type=str, default='training/book.bin', help='Đường dẫn file .bin đầu ra.')
+    parser.add_argument('--max-plies', type=int, default=16, help='Chỉ lấy các nước trong N ply đầu mỗi ván.')
+    parser.add_argument('--max-games', type=int, default=100000, help='Số ván tối đa được đọc.')
+    parser.add_argument('--min-count', type=int, default=3, help='Bỏ các nước xuất hiện ít hơn N lần.')
+    return parser.parse_args()
+
+
+def games_from_pgn(path):
+    # Trả về (danh sách chess.Move, kết quả '1-0' / '0-1' / '1/2-1/2')
+    with open(path, encoding='utf-8', errors='replace') as f:
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                break
+            yield list(game.mainline_moves()), game.headers.get('Result', '*')
+
+
+def games_from_parquet(path):
+    from datasets import load_dataset
+
+    dataset = load_dataset("parquet", data_files={'train': path}, split="train", streaming=True)
+    results = {'white': '1-0', 'black': '0-1', 'draw': '1/2-1/2'}
+    for game in dataset:
+        moves = []
+        for move_str in game.get('moves_uci') or []:
+            try:
+                moves.append(chess.Move.from_uci(move_str))
+            except ValueError:
+                break
+        yield moves, results.get(game.get('winner'), '*')
+
+
+def polyglot_move(board, move):
+    # Mã hoá nước đi theo Polyglot: to | from << 6 | promotion << 12,
+    # nhập thành được ghi dưới dạng Vua đi vào ô Xe (e1h1, e1a1)
+    to_square = move.to_square
+    if board.is_castling(move):
+        rank_base = move.from_square & 56
+        to_square = rank_base + 7 if move.to_square > move.from_square else rank_base
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def collect(games, max_plies, max_games):
+    counts = defaultdict(int)
+    weights = defaultdict(int)
+
+    for n, (moves, result) in enumerate(tqdm(games, total=max_games)):
+        if n >= max_games:
+            break
+        if result not in ('1-0', '0-1', '1/2-1/2'):
+            continue
+
+        board = chess.Board()
+        for move in moves[:max_plies]:
+            if not board.is_legal(move):
+                break
+
+            if result == '1/2-1/2':
+                points = DRAW_POINTS
+            elif (result == '1-0') == (board.turn == chess.WHITE):
+                points = WIN_POINTS
+            else:
+                points = 0
+
+            entry = (chess.polyglot.zobrist_hash(board), polyglot_move(board, move))
+            counts[entry] += 1
+            weights[entry] += points
+            board.push(move)
+
+    return counts, weights
+
+
+def write_book(path, counts, weights, min_count):
+    entries = []
+    for (key, raw_move), count in counts.items():
+        weight = weights[(key, raw_move)]
+        if count < min_count or weight == 0:
+            continue
+        entries.append((key, raw_move, weight))
+
+    # Trọng số Polyglot là uint16: co giãn lại nếu vượt quá
+    max_weight = max((w for _, _, w in entries), default=0)
+    scale = MAX_WEIGHT / max_weight if max_weight > MAX_WEIGHT else 1.0
+
+    entries.sort()
+    with open(path, 'wb') as f:
+        for key, raw_move, weight in entries:
+            f.write(chess.polyglot.ENTRY_STRUCT.pack(key, raw_move, max(1, int(weight * scale)), 0))
+    return len(entries)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.pgn:
+        games = games_from_pgn(args.pgn)
+    elif args.parquet:
+        games = games_from_parquet(args.parquet)
+    else:
+        print("[LỖI] Cần chỉ định --pgn hoặc --parquet.")
+        sys.exit(1)
+
+    source = args.pgn or args.parquet
+    if not os.path.exists(source):
+        print(f"[LỖI CRITICAL] Không tìm thấy file dữ liệu: {source}")
+        sys.exit(1)
+
+    print(f"Đang đọc ván cờ từ {source} (tối đa {args.max_games} ván, {args.max_plies} ply đầu)...")
+    counts, weights = collect(games, args.max_plies, args.max_games)
+    n_entries = write_book(args.output, counts, weights, args.min_count)
+    print(f"Đã ghi {n_entries} entry vào {args.output}")
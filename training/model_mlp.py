@@ -1,4 +1,6 @@
 # training/model_mlp.py
+import os
+
 import numpy as np
 try:
     import cupy as cp
@@ -106,6 +108,10 @@ class ChessMLP_Scratch:
             if isinstance(layer, LinearLayer):
                 layer.update(lr)
                 
+    def inference_engine(self, max_batch=256):
+        # Bản chỉ-suy-luận của model (xem InferenceMLP), dựng lại sau mỗi lần load/update weights
+        return InferenceMLP(self, max_batch)
+
     def save_weights(self, path):
         weights = {}
         for i, layer in enumerate(self.layers):
@@ -125,5 +131,169 @@ class ChessMLP_Scratch:
                 layer.W = xp.asarray(data[f'W{i}'])
                 layer.b = xp.asarray(data[f'b{i}'])
 
+class InferenceMLP:
+    # Chế độ chỉ suy luận của ChessMLP_Scratch (dùng khi chơi, không train):
+    # - weights float32, lưu sẵn dạng W.T liên tục để nhân theo hàng: (B, in) @ (in, out)
+    # - buffer activation cấp phát một lần theo max_batch, mỗi lần forward ghi đè lên
+    # - cộng bias rồi ReLU / Tanh tại chỗ trong buffer, không giữ x / Z / A như các layer train
+    # Kết quả giống ChessMLP_Scratch.forward (sai khác làm tròn của float32)
+
+    def __init__(self, model, max_batch=256):
+        linears = [layer for layer in model.layers if isinstance(layer, LinearLayer)]
+        self.weights = [xp.ascontiguousarray(layer.W.T, dtype=xp.float32) for layer in linears]
+        self.biases = [xp.ascontiguousarray(layer.b.reshape(-1), dtype=xp.float32) for layer in linears]
+        self.max_batch = 0
+        self._buffers = []
+        self._reserve(max_batch)
+
+    def _reserve(self, batch_size):
+        self.max_batch = batch_size
+        self._buffers = [xp.empty((batch_size, W.shape[1]), dtype=xp.float32) for W in self.weights]
+
+    def forward(self, X):
+        # X: (B, 13, 8, 8) hoặc (B, 832) theo hàng (khác ChessMLP_Scratch.forward nhận (832, B)
+        # khi X 2 chiều). Trả về (1, B) như ChessMLP_Scratch.forward
+        batch_size = X.shape[0]
+        if batch_size > self.max_batch:
+            self._reserve(batch_size)
+
+        out = X.reshape(batch_size, -1)
+        if out.dtype != xp.float32:
+            out = out.astype(xp.float32)
+        last = len(self.weights) - 1
+        for i, (W, b, buffer) in enumerate(zip(self.weights, self.biases, self._buffers)):
+            h = buffer[:batch_size]
+            xp.dot(out, W, out=h)
+            h += b
+            if i < last:
+                xp.maximum(h, 0, out=h)
+            else:
+                xp.tanh(h, out=h)
+            out = h
+
+        # Copy ra khỏi buffer để lần forward sau không ghi đè kết quả đã trả về
+        return out.T.copy()
+
+
+def quantized_path(model_path):
+    # Đường dẫn mặc định của checkpoint int8 ứng với một checkpoint float: model.npz -> model_int8.npz
+    root, _ = os.path.splitext(model_path)
+    return root + '_int8.npz'
+
+
+def quantize_weights(model):
+    # Post-training quantization: W (out, in) -> int8 với một scale float32 cho mỗi hàng
+    # (scale = max|W hàng| / 127, W ~ Wq * scale); bias giữ float32.
+    # Trả về dict {Wq{i}, scale{i}, b{i}} theo chỉ số layer như save_weights, để np.savez
+    weights = {}
+    for i, layer in enumerate(model.layers):
+        if isinstance(layer, LinearLayer):
+            W = layer.W
+            b = layer.b
+            if xp.__name__ == 'cupy':
+                W = xp.asnumpy(W)
+                b = xp.asnumpy(b)
+            W = np.asarray(W, dtype=np.float64)
+            scale = np.abs(W).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            weights[f'Wq{i}'] = np.round(W / scale[:, None]).astype(np.int8)
+            weights[f'scale{i}'] = scale.astype(np.float32)
+            weights[f'b{i}'] = np.asarray(b, dtype=np.float32).reshape(-1)
+    return weights
+
+
+class QuantizedMLP:
+    # Suy luận với weights int8 (chỉ CPU / NumPy), dựng từ dict của quantize_weights:
+    # - Lớp đầu (832 -> 1024, chiếm phần lớn bộ nhớ và phép tính): input là 0/1 ở 12 mặt phẳng
+    #   quân và ±1 ở mặt phẳng lượt đi (utils.board_to_array), nên W.x là tổng các cột int8
+    #   của những ô có quân (~32 cột thay vì 832) cộng ±tổng các cột lượt đi, cộng dồn bằng
+    #   int32 rồi mới nhân scale của từng hàng. Batch là các thế cờ con của cùng một thế cờ
+    #   (MLPAgent) thì mỗi dòng chỉ khác dòng đầu vài ô: cộng dồn phần chênh lệch so với
+    #   tổng của dòng đầu, như accumulator của NNUE
+    # - Các lớp sau: input là activation thực nên weights int8 * scale được giải lượng tử một
+    #   lần sang float32 và nhân bằng BLAS như InferenceMLP
+    # forward nhận / trả về cùng dạng với InferenceMLP.forward
+
+    def __init__(self, weights, max_batch=256):
+        ids = sorted(int(key[2:]) for key in weights if key.startswith('Wq'))
+        first = ids[0]
+        Wq = np.asarray(weights[f'Wq{first}'], dtype=np.int8)
+        # (1537, 1024): hàng f là cột của đặc trưng quân f, hàng 768 + f là cột đó đổi dấu,
+        # hàng cuối toàn 0 dùng để đệm
+        columns = Wq[:, :768].T
+        self.piece_columns = np.ascontiguousarray(np.vstack([columns, -columns, np.zeros((1, Wq.shape[0]), dtype=np.int8)]))
+        self.turn_column = Wq[:, 768:].sum(axis=1, dtype=np.int32)
+        self.first_scale = np.asarray(weights[f'scale{first}'], dtype=np.float32)
+        self.first_bias = np.asarray(weights[f'b{first}'], dtype=np.float32).reshape(-1)
+
+        self.weights = []
+        self.biases = []
+        for i in ids[1:]:
+            W = weights[f'Wq{i}'].astype(np.float32) * np.asarray(weights[f'scale{i}'], dtype=np.float32)[:, None]
+            self.weights.append(np.ascontiguousarray(W.T))
+            self.biases.append(np.asarray(weights[f'b{i}'], dtype=np.float32).reshape(-1))
+        self.max_batch = 0
+        self._buffers = []
+        self._reserve(max_batch)
+
+    @classmethod
+    def load(cls, path, max_batch=256):
+        data = np.load(path)
+        return cls({key: data[key] for key in data.files}, max_batch)
+
+    def _reserve(self, batch_size):
+        self.max_batch = batch_size
+        sizes = [self.piece_columns.shape[1]] + [W.shape[1] for W in self.weights]
+        self._buffers = [np.empty((batch_size, size), dtype=np.float32) for size in sizes]
+
+    def forward(self, X):
+        batch_size = X.shape[0]
+        if batch_size > self.max_batch:
+            self._reserve(batch_size)
+        if xp.__name__ == 'cupy':
+            X = xp.asnumpy(X)
+        flat = X.reshape(batch_size, -1)
+
+        # Cộng dồn int32 (tối đa 64 cột * 127 cho mỗi phần, không tràn)
+        pieces = flat[:, :768]
+        delta = pieces - pieces[0]
+        if np.count_nonzero(delta, axis=1).max() < np.count_nonzero(pieces, axis=1).max():
+            acc = self._sum_columns(pieces[:1]) + self._sum_columns(delta)
+        else:
+            acc = self._sum_columns(pieces)
+        acc += flat[:, 768].astype(np.int32)[:, None] * self.turn_column
+
+        h = self._buffers[0][:batch_size]
+        h[...] = acc
+        h *= self.first_scale
+        h += self.first_bias
+        np.maximum(h, 0, out=h)
+
+        out = h
+        last = len(self.weights) - 1
+        for i, (W, b, buffer) in enumerate(zip(self.weights, self.biases, self._buffers[1:])):
+            h = buffer[:batch_size]
+            np.dot(out, W, out=h)
+            h += b
+            if i < last:
+                np.maximum(h, 0, out=h)
+            else:
+                np.tanh(h, out=h)
+            out = h
+        return out.T.copy()
+
+    def _sum_columns(self, features):
+        # Tổng int32 của ±cột (theo dấu của đặc trưng) cho từng dòng: chỉ số các đặc trưng khác 0
+        # xếp thành bảng (số dòng, nhiều nhất trong một dòng), chỗ trống trỏ vào hàng 0 cuối
+        # piece_columns. np.nonzero trả về theo thứ tự dòng
+        nonzero = features != 0
+        counts = nonzero.sum(axis=1)
+        rows, columns = np.nonzero(nonzero)
+        starts = np.cumsum(counts) - counts
+        index = np.full((features.shape[0], max(int(counts.max()), 1)), len(self.piece_columns) - 1, dtype=np.intp)
+        index[rows, np.arange(len(rows)) - starts[rows]] = columns + 768 * (features[rows, columns] < 0)
+        return np.take(self.piece_columns, index, axis=0).sum(axis=1, dtype=np.int32)
+
+
 def to_device(x):
     return xp.asarray(x)
@@ -0,0 +1,128 @@
+# training/quantize_mlp.py
+import argparse
+import os
+import sys
+import time
+
+import chess
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import boards_to_array
+from training.model_mlp import ChessMLP_Scratch, QuantizedMLP, quantize_weights, quantized_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lượng tử hoá checkpoint MLP sang weights int8 (scale theo hàng) và so sánh với float")
+    parser.add_argument('--model-path', type=str, default='training/best_model_mlp.npz')
+    parser.add_argument('--output', type=str, default=None,
+                        help='File .npz int8 (mặc định: <model>_int8.npz, MLPAgent(quantized=True) tự tìm file này).')
+    parser.add_argument('--data', type=str, default='training/dataset_large.csv',
+                        help='CSV (fen, eval) dùng để đo độ chính xác.')
+    parser.add_argument('--holdout', type=int, default=5000, help='Số dòng cuối của CSV dùng để đo.')
+    parser.add_argument('--batch-sizes', type=str, default='1,16,64,256',
+                        help='Danh sách batch size cần đo tốc độ.')
+    parser.add_argument('--move-positions', type=int, default=200,
+                        help='Số thế cờ đo tốc độ theo kiểu MLPAgent (một batch = mọi nước đi của thế cờ).')
+    return parser.parse_args()
+
+
+def metrics(predictions, targets):
+    # MSE / MAE so với nhãn, và tỉ lệ đoán đúng bên có lợi (bỏ qua nhãn 0)
+    error = predictions - targets
+    decided = targets != 0
+    accuracy = np.mean(np.sign(predictions[decided]) == np.sign(targets[decided])) if decided.any() else 0.0
+    return float(np.mean(error ** 2)), float(np.mean(np.abs(error))), float(accuracy)
+
+
+def predict(engine, X, batch_size=256):
+    return np.concatenate([np.asarray(engine.forward(X[i:i + batch_size])).reshape(-1)
+                           for i in range(0, len(X), batch_size)])
+
+
+def positions_per_second(forward, batches):
+    # Chạy lần lượt các batch, lặp lại đến khi đủ ~0.5s để số đo ổn định
+    forward(batches[0])
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for batch in batches:
+            forward(batch)
+            done += len(batch)
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.5:
+            return done / elapsed
+
+
+def move_batches(boards):
+    # Batch giống MLPAgent._score_moves: các thế cờ sau mỗi nước hợp lệ của một thế cờ
+    batches = []
+    for board in boards:
+        children = []
+        for move in board.legal_moves:
+            board.push(move)
+            children.append(board.copy(stack=False))
+            board.pop()
+        if children:
+            batches.append(boards_to_array(children))
+    return batches
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = args.output or quantized_path(args.model_path)
+
+    if not os.path.exists(args.model_path):
+        print(f"[LỖI] Không tìm thấy file trọng số {args.model_path}. Vui lòng train trước.")
+        sys.exit(1)
+    model = ChessMLP_Scratch()
+    model.load_weights(args.model_path)
+
+    weights = quantize_weights(model)
+    np.savez(output, **weights)
+    print(f"Đã lưu weights int8: {output} ({os.path.getsize(output) / 1e6:.2f} MB, "
+          f"float: {os.path.getsize(args.model_path) / 1e6:.2f} MB)")
+
+    engine = model.inference_engine(256)
+    quantized = QuantizedMLP(weights, 256)
+
+    if not os.path.exists(args.data):
+        print(f"[LỖI] Không tìm thấy file dữ liệu: {args.data}")
+        sys.exit(1)
+    df = pd.read_csv(args.data).tail(args.holdout)
+    boards = [chess.Board(fen) for fen in df['fen']]
+    X = boards_to_array(boards)
+    y = df['eval'].to_numpy(dtype=np.float64)
+
+    float_pred = predict(engine, X)
+    int8_pred = predict(quantized, X)
+    float_mse, float_mae, float_acc = metrics(float_pred, y)
+    int8_mse, int8_mae, int8_acc = metrics(int8_pred, y)
+
+    print(f"\n--- ĐỘ CHÍNH XÁC ({len(df)} dòng cuối của {args.data}) ---")
+    print(f"{'':8s} {'MSE':>9s} {'MAE':>9s} {'đúng bên':>9s}")
+    print(f"{'float32':8s} {float_mse:9.5f} {float_mae:9.5f} {float_acc:9.2%}")
+    print(f"{'int8':8s} {int8_mse:9.5f} {int8_mae:9.5f} {int8_acc:9.2%}")
+    print(f"{'delta':8s} {int8_mse - float_mse:+9.5f} {int8_mae - float_mae:+9.5f} {int8_acc - float_acc:+9.2%}")
+    diff = np.abs(int8_pred - float_pred)
+    print(f"|int8 - float|: trung bình {diff.mean():.2e}, lớn nhất {diff.max():.2e}, "
+          f"cùng dấu {np.mean(np.sign(int8_pred) == np.sign(float_pred)):.2%}")
+
+    print(f"\n--- TỐC ĐỘ CPU (pos/s) ---")
+    print(f"{'batch':>10s} {'float32':>10s} {'int8':>10s} {'nhanh hơn':>10s}")
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        n = len(X) - len(X) % batch_size
+        if n == 0:
+            continue
+        batches = [X[i:i + batch_size] for i in range(0, n, batch_size)]
+        base = positions_per_second(engine.forward, batches)
+        fast = positions_per_second(quantized.forward, batches)
+        print(f"{batch_size:10d} {base:10,.0f} {fast:10,.0f} {fast / base:9.2f}x")
+
+    batches = move_batches(boards[:args.move_positions])
+    if batches:
+        base = positions_per_second(engine.forward, batches)
+        fast = positions_per_second(quantized.forward, batches)
+        print(f"{'nước đi':>10s} {base:10,.0f} {fast:10,.0f} {fast / base:9.2f}x  "
+              f"(batch = mọi nước của một thế cờ, như MLPAgent)")
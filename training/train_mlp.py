@@ -8,7 +8,7 @@ import argparse
 from tqdm import tqdm
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import board_to_tensor
+from utils import boards_to_array
 from training.model_mlp import ChessMLP_Scratch, xp
 
 
@@ -69,19 +69,13 @@ def parse_args():
     return parser.parse_args()
 
 
-def load_data_batch(df, start_idx, end_idx):
+def load_data_batch(df, start_idx, end_idx, out=None):
+    # out: buffer float32 (batch_size, 13, 8, 8) dùng lại giữa các batch (utils.boards_to_array)
     batch_data = df.iloc[start_idx:end_idx]
-    X_list = []
-    y_list = []
-    
-    for _, row in batch_data.iterrows():
-        board = chess.Board(row['fen'])
-        tensor = board_to_tensor(board).numpy()
-        X_list.append(tensor)
-        y_list.append(float(row['eval']))
-        
-    X_batch = np.array(X_list)
-    y_batch = np.array(y_list)
+    boards = [chess.Board(fen) for fen in batch_data['fen']]
+
+    X_batch = boards_to_array(boards, out)
+    y_batch = batch_data['eval'].to_numpy(dtype=np.float64)
     
     return xp.asarray(X_batch), xp.asarray(y_batch)
 
@@ -130,6 +124,7 @@ def train(args):
         print(f"\n[INFO] Train From Scratch. Model khởi tạo ngẫu nhiên.")
 
     print("\n--- BẮT ĐẦU TRAINING ---")
+    input_buffer = np.zeros((args.batch_size, 13, 8, 8), dtype=np.float32)
     for epoch in range(args.epochs):
         df = df.sample(frac=1).reset_index(drop=True)
         
@@ -141,7 +136,7 @@ def train(args):
             start = i * args.batch_size
             end = min((i + 1) * args.batch_size, n_samples)
             
-            X, y = load_data_batch(df, start, end)
+            X, y = load_data_batch(df, start, end, input_buffer)
             
             y_pred = model.forward(X)  # Shape: (1, batch_size)
             
@@ -1,7 +1,6 @@
 # utils.py
 import chess
 import numpy as np
-import torch
 
 PIECE_TO_INDEX = {
     'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5,
@@ -9,23 +8,72 @@ PIECE_TO_INDEX = {
 }
 
 
-def board_to_tensor(board):
-
-    matrix = np.zeros((13, 8, 8), dtype=np.float32)
-
-    for square, piece in board.piece_map().items():
-        
-        row = 7 - (square // 8)  
-        col = square % 8         
+def board_to_array(board, out=None):
+    # Mã hoá thế cờ thành mảng NumPy (13, 8, 8), giống board_to_tensor nhưng không qua torch.
+    # out: mảng (13, 8, 8) float32 có sẵn để ghi vào (ví dụ một dòng của batch)
+    if out is None:
+        matrix = np.zeros((13, 8, 8), dtype=np.float32)
+    else:
+        matrix = out
+        matrix.fill(0.0)
 
-        symbol = piece.symbol()  
-        if symbol in PIECE_TO_INDEX:
-            channel = PIECE_TO_INDEX[symbol]
-            matrix[channel][row][col] = 1.0
+    # Duyệt bit của bitboard từng loại quân thay vì piece_map(): ô `square` nằm ở
+    # hàng 7 - square // 8, cột square % 8, tức vị trí square ^ 56 trong mặt phẳng 8x8
+    indices = []
+    for color, offset in ((chess.WHITE, 0), (chess.BLACK, 6)):
+        for piece_type in chess.PIECE_TYPES:
+            base = (offset + piece_type - 1) * 64
+            indices.extend(base + (square ^ 56) for square in chess.scan_forward(board.pieces_mask(piece_type, color)))
+    matrix.reshape(-1)[indices] = 1.0
 
     if board.turn == chess.WHITE:
         matrix[12, :, :] = 1.0
     else:
         matrix[12, :, :] = -1.0
 
-    return torch.from_numpy(matrix)
+    return matrix
+
+
+def board_bitboards(board):
+    # 12 bitboard theo thứ tự mặt phẳng của PIECE_TO_INDEX (P N B R Q K rồi p n b r q k)
+    # và dấu lượt đi (1 Trắng, -1 Đen). Dùng được cho chess.Board lẫn CompactBoard
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    pawns, knights, bishops = board.pawns, board.knights, board.bishops
+    rooks, queens, kings = board.rooks, board.queens, board.kings
+    return ((pawns & white, knights & white, bishops & white, rooks & white, queens & white, kings & white,
+             pawns & black, knights & black, bishops & black, rooks & black, queens & black, kings & black),
+            1.0 if board.turn == chess.WHITE else -1.0)
+
+
+def bitboards_to_array(bitboards, turns, out=None):
+    # Mã hoá cả batch một lần: bitboards là N bộ 12 bitboard (board_bitboards), turns là N dấu
+    # lượt đi. out: buffer float32 (M, 13, 8, 8) hoặc (M, 832) có sẵn với M >= N; trả về N dòng
+    # đầu của out (cùng shape với out), không tạo tensor torch
+    n = len(bitboards)
+    if out is None:
+        out = np.empty((n, 13, 8, 8), dtype=np.float32)
+    flat = out.reshape(out.shape[0], 832)
+    # Ghi uint64 theo big-endian: byte đầu là hàng 8, bit thấp nhất của mỗi byte là cột a,
+    # nên unpackbits(bitorder='little') cho đúng vị trí square ^ 56 trong mặt phẳng 8x8
+    bits = np.unpackbits(np.array(bitboards, dtype='>u8').view(np.uint8), bitorder='little')
+    flat[:n, :768] = bits.reshape(n, 768)
+    flat[:n, 768:] = np.asarray(turns, dtype=np.float32)[:, None]
+    return out[:n]
+
+
+def boards_to_array(boards, out=None):
+    # Mã hoá N thế cờ thành mảng (N, 13, 8, 8) (hoặc theo shape của out), xem bitboards_to_array
+    bitboards = []
+    turns = []
+    for board in boards:
+        planes, turn = board_bitboards(board)
+        bitboards.append(planes)
+        turns.append(turn)
+    return bitboards_to_array(bitboards, turns, out)
+
+
+def board_to_tensor(board):
+    # torch chỉ được import khi thật sự cần tensor (import torch tốn vài giây lúc khởi động)
+    import torch
+    return torch.from_numpy(board_to_array(board))